@@ -0,0 +1,203 @@
+import json
+from functools import partial
+
+from rest_framework.fields import (
+    DateField,
+    DateTimeField,
+    DecimalField,
+    FloatField,
+    IntegerField,
+    TimeField,
+)
+
+from drf_excel.fields import (
+    XLSXBooleanField,
+    XLSXDateField,
+    XLSXListField,
+    XLSXNumberField,
+)
+from drf_excel.renderers import _MISSING, XLSXRenderer, _mapped_value
+from drf_excel.utilities import get_setting
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# Errors of values that can't be converted to the type of their column
+ARROW_ERRORS = (TypeError, ValueError, OverflowError) + (
+    (pa.ArrowInvalid, pa.ArrowTypeError) if pa else ()
+)
+
+
+class ArrowRenderer(XLSXRenderer):
+    """
+    Renderer for Apache Arrow IPC streams, with the columns and values of
+    `XLSXRenderer`: the same view attributes select, label and format the columns,
+    and the type of each column follows the serializer field (Integer, Float,
+    Decimal, Date, DateTime, Time, Boolean and List). Rows are written in record
+    batches of `xlsx_batch_size` rows.
+    """
+
+    media_type = "application/vnd.apache.arrow.stream"
+    format = "arrow"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if pa is None:
+            raise ImportError("You must install pyarrow to render Arrow files")
+        if data is None:
+            return b""
+
+        if not self._check_validation_data(data):
+            return json.dumps(data)
+
+        results = data["results"] if "results" in data else data
+        if isinstance(results, dict):
+            results = [results]
+
+        renderer_context = renderer_context or {}
+        drf_view = renderer_context.get("view")
+        self._load_template(drf_view, has_results=bool(len(results)))
+        batch_size = getattr(drf_view, "xlsx_batch_size", 1000)
+        get_progress = getattr(drf_view, "get_xlsx_progress", None)
+        progress = get_progress() if get_progress else None
+
+        try:
+            if progress is not None:
+                progress.set_phase("writing", total=len(results))
+            row_values = self._get_row_values(results)
+            self._init_column_fields()
+            self.arrow_types = [
+                self._arrow_type(key) for key, _ in self.column_accessors
+            ]
+            sink = pa.BufferOutputStream()
+            writer = None
+            for chunk in self._chunks(results, batch_size):
+                chunk_values = [row_values(row) for row in chunk]
+                chunk_mapped = self._map_batch_columns(chunk_values)
+                batch = self._record_batch(chunk_values, chunk_mapped)
+                if writer is None:
+                    writer = self._open_writer(sink, batch.schema)
+                writer.write_batch(batch)
+                if progress is not None:
+                    progress.advance(len(chunk))
+            if writer is None:
+                writer = self._open_writer(sink, self._record_batch([], []).schema)
+            writer.close()
+            content = sink.getvalue().to_pybytes()
+        except Exception:
+            if progress is not None:
+                progress.finish(failed=True)
+            raise
+        if progress is not None:
+            progress.finish()
+        return content
+
+    def _open_writer(self, sink, schema):
+        return pa.ipc.new_stream(sink, schema)
+
+    def _load_child_sheets(self, drf_view, header_dict, use_labels):
+        # Single table: lists of objects stay in their column
+        return []
+
+    def _arrow_type(self, key):
+        """
+        Returns the Arrow type of a column from the field class picked by
+        `_drf_to_xlsx_field`, or `None` to infer it from the first batch.
+        """
+        if self._get_mapping(key):
+            return None
+        xlsx_field = self._drf_to_xlsx_field(key=key, value=None)
+        drf_field = xlsx_field.drf_field
+        if isinstance(xlsx_field, XLSXBooleanField):
+            if self.boolean_display or get_setting("BOOLEAN_DISPLAY"):
+                return pa.string()
+            return pa.bool_()
+        if isinstance(xlsx_field, XLSXNumberField):
+            if isinstance(drf_field, IntegerField):
+                return pa.int64()
+            if isinstance(drf_field, DecimalField) and drf_field.max_digits:
+                decimal_places = drf_field.decimal_places or 0
+                if drf_field.max_digits <= 38:
+                    return pa.decimal128(drf_field.max_digits, decimal_places)
+                return pa.decimal256(drf_field.max_digits, decimal_places)
+            if isinstance(drf_field, (FloatField, DecimalField)):
+                return pa.float64()
+        if isinstance(xlsx_field, XLSXDateField):
+            if isinstance(drf_field, DateTimeField):
+                return pa.timestamp("us")
+            if isinstance(drf_field, DateField):
+                return pa.date32()
+            if isinstance(drf_field, TimeField):
+                return pa.time64("us")
+        if isinstance(xlsx_field, XLSXListField):
+            # Joined like in the spreadsheet
+            return pa.string()
+        return None
+
+    def _cell_value(self, index, key, value, mapped_value=_MISSING):
+        if value is _MISSING:
+            return None
+        if mapped_value is not _MISSING:
+            xlsx_field = self._drf_to_xlsx_field(
+                key=key, value=value, mapping=partial(_mapped_value, mapped_value)
+            )
+        else:
+            xlsx_field = self._column_field(index, key, value).load(value)
+        if xlsx_field.mapping:
+            return xlsx_field.custom_mapping()
+        return xlsx_field.prep_value()
+
+    def _record_batch(self, chunk_values, chunk_mapped):
+        arrays = []
+        for index, (key, _) in enumerate(self.column_accessors):
+            values = [
+                self._cell_value(index, key, values[index], mapped.get(index, _MISSING))
+                for values, mapped in zip(chunk_values, chunk_mapped)
+            ]
+            arrow_type = self.arrow_types[index]
+            array = self._to_array(values, arrow_type)
+            if arrow_type is None:
+                # Inferred from the first batch, and kept for the next ones
+                if pa.types.is_null(array.type):
+                    array = array.cast(pa.string())
+                self.arrow_types[index] = array.type
+            arrays.append(array)
+        names = [str(title) for title in self.column_titles_display]
+        return pa.RecordBatch.from_arrays(arrays, names=names)
+
+    @staticmethod
+    def _to_array(values, arrow_type):
+        try:
+            return pa.array(values, type=arrow_type)
+        except ARROW_ERRORS:
+            if arrow_type is None:
+                # Mixed values, i.e. from a method field
+                return pa.array(
+                    [None if value is None else str(value) for value in values],
+                    type=pa.string(),
+                )
+        # Values that don't fit the type of their column are left empty
+        converted = []
+        for value in values:
+            try:
+                converted.append(pa.scalar(value, type=arrow_type))
+            except ARROW_ERRORS:
+                converted.append(pa.scalar(None, type=arrow_type))
+        return pa.array(converted, type=arrow_type)
+
+
+class ParquetRenderer(ArrowRenderer):
+    """
+    Renderer for Apache Parquet files, with the columns and values of
+    `ArrowRenderer`. Each batch of rows is written as a row group.
+    """
+
+    media_type = "application/vnd.apache.parquet"
+    format = "parquet"
+
+    def _open_writer(self, sink, schema):
+        return pq.ParquetWriter(sink, schema)
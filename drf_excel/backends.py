@@ -0,0 +1,111 @@
+from io import BytesIO
+from tempfile import TemporaryFile
+
+from drf_excel.sheets import WriteOnlySheet, XlsxWriterBook
+
+
+class WorkbookBackend:
+    """
+    Creates, finishes and saves the workbooks and sheets written by `XLSXRenderer`.
+    Sheets give the renderer the part of the openpyxl worksheet API it uses: `title`,
+    `cell()` returning an openpyxl cell to style, `merge_cells()`, `row_dimensions`,
+    `column_dimensions`, `sheet_format`, `views`, `add_image()` and `add_table()`.
+    """
+
+    # Whether the column widths must be set before the first row is written
+    columns_before_rows = False
+
+    def new_workbook(self):
+        raise NotImplementedError
+
+    def new_sheet(self, wb, title=None):
+        raise NotImplementedError
+
+    def finish_sheet(self, ws):
+        """
+        Called once all the rows of a sheet are written.
+        """
+
+    def save(self, wb) -> bytes:
+        raise NotImplementedError
+
+
+class OpenpyxlBackend(WorkbookBackend):
+    """
+    Builds the workbook in memory with openpyxl, or streams its rows with openpyxl's
+    write only mode when `write_only` is set.
+    """
+
+    def __init__(self, write_only=False):
+        self.write_only = write_only
+        self.columns_before_rows = write_only
+
+    def new_workbook(self):
+        from openpyxl import Workbook
+
+        wb = Workbook(write_only=self.write_only)
+        if not self.write_only:
+            # Sheets are created by `new_sheet`
+            wb.remove(wb.active)
+        return wb
+
+    def new_sheet(self, wb, title=None):
+        ws = wb.create_sheet(title)
+        return WriteOnlySheet(ws) if self.write_only else ws
+
+    def finish_sheet(self, ws):
+        if isinstance(ws, WriteOnlySheet):
+            ws.flush()
+
+    def save(self, wb):
+        from openpyxl.writer.excel import save_workbook
+
+        with TemporaryFile() as tmp:
+            save_workbook(wb, tmp)
+            tmp.seek(0)
+            return tmp.read()
+
+
+class XlsxWriterBackend(WorkbookBackend):
+    """
+    Streams the rows with XlsxWriter. In `constant_memory` mode each row is written
+    to a temporary file as soon as the next one starts, which doesn't support
+    Excel tables.
+    """
+
+    def __init__(self, constant_memory=True):
+        self.constant_memory = constant_memory
+
+    def new_workbook(self):
+        try:
+            import xlsxwriter
+        except ImportError as e:
+            raise ImportError(
+                "You must install XlsxWriter to use the 'xlsxwriter' engine"
+            ) from e
+
+        output = BytesIO()
+        workbook = xlsxwriter.Workbook(
+            output, {"constant_memory": self.constant_memory}
+        )
+        return XlsxWriterBook(workbook, output)
+
+    def new_sheet(self, wb, title=None):
+        return wb.create_sheet(title)
+
+    def finish_sheet(self, ws):
+        ws.finish()
+
+    def save(self, wb):
+        wb.workbook.close()
+        return wb.output.getvalue()
+
+
+def get_backend(engine, tables=False):
+    """
+    Returns the backend of an `xlsx_engine`: `openpyxl`, `write_only` or
+    `xlsxwriter`, the last one keeping rows in memory when the sheets have `tables`.
+    """
+    if engine == "xlsxwriter":
+        return XlsxWriterBackend(constant_memory=not tables)
+    return OpenpyxlBackend(write_only=engine == "write_only")
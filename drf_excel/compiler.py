@@ -0,0 +1,171 @@
+from collections.abc import MutableMapping
+
+from django.db import models
+from django.utils.functional import Promise
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject
+from rest_framework.serializers import Serializer
+
+from drf_excel.querysets import _uses_custom_representation
+from drf_excel.renderers import _MISSING
+
+
+class CompileError(Exception):
+    """
+    Raised when a serializer can't be compiled to a row function, the regular
+    serializer output is used instead.
+    """
+
+
+class XLSXRows(list):
+    """
+    Rows of an export as tuples of values in the order of `xlsx_keys`, followed by
+    the row color when `xlsx_row_color` is set.
+    """
+
+    def __init__(self, rows, keys, row_color=False):
+        super().__init__(rows)
+        self.xlsx_keys = tuple(keys)
+        self.xlsx_row_color = row_color
+
+
+class XLSXRowSerializer:
+    """
+    Stand-in for a `many=True` serializer whose `data` are the rows of `instance`
+    as tuples, computed with a compiled row function.
+    """
+
+    def __init__(self, instance, row, keys, row_color=False):
+        self.instance = instance
+        self.row = row
+        self.keys = keys
+        self.row_color = row_color
+
+    @property
+    def data(self):
+        instance = self.instance
+        if isinstance(instance, models.manager.BaseManager):
+            instance = instance.all()
+        row = self.row
+        return XLSXRows((row(obj) for obj in instance), self.keys, self.row_color)
+
+
+def _leaf_getter(field):
+    def get(instance, out):
+        try:
+            attribute = field.get_attribute(instance)
+        except SkipField:
+            out.append(_MISSING)
+            return
+        check_for_none = (
+            attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+        )
+        if check_for_none is None:
+            out.append(None)
+            return
+        value = field.to_representation(attribute)
+        # Same values as the columns read from the serializer output
+        if isinstance(value, Promise):
+            value = value.__class__._proxy____cast(value)
+        elif isinstance(value, MutableMapping):
+            value = _MISSING
+        out.append(value)
+
+    return get
+
+
+def _nested_getter(field, getters, size):
+    missing = (_MISSING,) * size
+
+    def get(instance, out):
+        try:
+            attribute = field.get_attribute(instance)
+        except SkipField:
+            attribute = None
+        if attribute is None:
+            out.extend(missing)
+            return
+        for getter in getters:
+            getter(attribute, out)
+
+    return get
+
+
+def _compile_fields(serializer, tree):
+    """
+    Returns functions appending the column values of an object to a list, in the
+    order of `tree`, a dict of field names to nested dicts (or `None` for columns).
+    """
+    if _uses_custom_representation(serializer):
+        raise CompileError(f"{type(serializer).__name__} has a custom representation")
+    fields = serializer.fields
+    getters = []
+    for name, children in tree.items():
+        field = fields.get(name)
+        if field is None or field.write_only:
+            raise CompileError(f"Unknown export field '{name}'")
+        if children is None:
+            getters.append(_leaf_getter(field))
+        elif isinstance(field, Serializer):
+            nested_getters = _compile_fields(field, children)
+            getters.append(_nested_getter(field, nested_getters, _count(children)))
+        else:
+            raise CompileError(f"Field '{name}' isn't a nested serializer")
+    return getters
+
+
+def _count(tree):
+    return sum(
+        1 if children is None else _count(children) for children in tree.values()
+    )
+
+
+def _key_tree(keys, key_sep="."):
+    tree = {}
+    for key in keys:
+        *parents, name = key.split(key_sep)
+        node = tree
+        for parent in parents:
+            node = node.setdefault(parent, {})
+            if node is None:
+                raise CompileError(f"Column '{parent}' isn't a nested serializer")
+        if name in node:
+            raise CompileError(f"Column '{key}' is a nested serializer")
+        node[name] = None
+    return tree
+
+
+def _flatten_tree(tree, parent_key="", key_sep="."):
+    keys = []
+    for name, children in tree.items():
+        key = f"{parent_key}{key_sep}{name}" if parent_key else name
+        if children is None:
+            keys.append(key)
+        else:
+            keys.extend(_flatten_tree(children, key, key_sep))
+    return keys
+
+
+def compile_serializer(serializer, keys, row_color=False, key_sep="."):
+    """
+    Compile `serializer` into a function returning, for an object, the tuple of the
+    values of the flattened header `keys` (followed by the `row_color` value when
+    set), without building the intermediate dicts of `to_representation`. Raises
+    `CompileError` if a key can't be read from the serializer fields.
+    """
+    keys = list(keys)
+    if row_color:
+        keys.append("row_color")
+    tree = _key_tree(keys, key_sep)
+    if _flatten_tree(tree, key_sep=key_sep) != keys:
+        # The columns of a nested serializer must follow each other
+        raise CompileError("Columns can't be emitted in order")
+    getters = _compile_fields(serializer, tree)
+
+    def row(instance):
+        out = []
+        for getter in getters:
+            getter(instance, out)
+        return tuple(out)
+
+    return row
@@ -2,6 +2,7 @@ import contextlib
 import datetime
 import json
 from collections.abc import Iterable
+from copy import copy
 from decimal import Decimal
 from typing import Any, Callable, Union
 
@@ -48,6 +49,8 @@ class XLSXField:
         self.style = style
         self.mapping = mapping
         self.cell_style = cell_style
+        # Style array copied by `cell` instead of styling the cell, set by `write`
+        self.style_array = None
         self.value = self.init_value(value)
 
     def init_value(self, value):
@@ -66,17 +69,51 @@ class XLSXField:
     def prep_cell(self, cell: Cell):
         set_cell_style(cell, self.style)
 
+    def load(self, value):
+        """
+        Set the value of the next cell, so a single field writes all the cells of
+        its column.
+        """
+        self.original_value = value
+        self.value = self.init_value(value)
+        return self
+
+    def write(
+        self, ws: Worksheet, row, column, value, mapping=None, style=None
+    ) -> Cell:
+        """
+        Write `value` to the cell at `row` and `column`. `mapping` replaces the
+        mapping of the column for this cell only, and `style`, the style array of
+        the column, is copied to the cell instead of styling it again.
+        """
+        self.load(value)
+        column_mapping = self.mapping
+        if mapping is not None:
+            self.mapping = mapping
+        self.style_array = style
+        try:
+            return self.cell(ws, row, column)
+        finally:
+            self.mapping = column_mapping
+            self.style_array = None
+
     def cell(self, ws: Worksheet, row, column) -> Cell:
         # If we have a custom mapping use it and done. If not prep value for output
         value = self.custom_mapping() if self.mapping else self.prep_value()
         if self.sanitize:
             value = sanitize_value(value)
         cell: Cell = ws.cell(row, column, value)
+        if self.style_array is not None:
+            cell._style = copy(self.style_array)
+        else:
+            self.style_cell(cell)
+        return cell
+
+    def style_cell(self, cell: Cell):
         self.prep_cell(cell)
         # Provided cell style always has priority
         if self.cell_style:
             set_cell_style(cell, self.cell_style)
-        return cell
 
 
 class XLSXNumberField(XLSXField):
@@ -0,0 +1,99 @@
+import hashlib
+import os
+from io import BytesIO
+
+from openpyxl.drawing.image import Image, PILImage
+
+from drf_excel.cache import LRUCache
+
+# Formats embedded as is by openpyxl, others are converted to png
+EMBEDDED_FORMATS = ("gif", "jpeg", "png")
+
+image_cache = LRUCache(maxsize=32)
+
+
+class CachedImage(Image):
+    """
+    openpyxl image created from already encoded bytes and dimensions, without opening
+    and decoding the image again.
+    """
+
+    def __init__(self, data, width, height, format):
+        self.ref = BytesIO(data)
+        self.width = width
+        self.height = height
+        self.format = format
+        self._cached_data = data
+
+    def _data(self):
+        return self._cached_data
+
+
+def _cache_key(source):
+    """
+    Returns the cache key of an image source: a filesystem path (keyed by path and
+    modification time), a storage file (keyed by storage, name and modification time
+    when the storage supports it), bytes or a file-like object (keyed by content).
+    """
+    if isinstance(source, (str, os.PathLike)):
+        stat = os.stat(source)
+        return ("path", os.fspath(source), stat.st_mtime_ns, stat.st_size)
+    storage = getattr(source, "storage", None)
+    name = getattr(source, "name", None)
+    if storage is not None and name:
+        try:
+            modified_time = storage.get_modified_time(name)
+        except (NotImplementedError, AttributeError):
+            modified_time = None
+        return ("storage", type(storage).__qualname__, name, modified_time)
+    return None
+
+
+def _read(source):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source)
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return f.read()
+    storage = getattr(source, "storage", None)
+    if storage is not None and getattr(source, "name", None):
+        with storage.open(source.name, "rb") as f:
+            return f.read()
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return source.read()
+
+
+def _load(data):
+    """
+    Decode the image once to get its dimensions, converting it to png if it isn't
+    embeddable as is.
+    """
+    if not PILImage:
+        raise ImportError("You must install Pillow to fetch image objects")
+    with PILImage.open(BytesIO(data)) as img:
+        width, height = img.size
+        format = (img.format or "png").lower()
+        if format not in EMBEDDED_FORMATS:
+            buffer = BytesIO()
+            img.save(buffer, format="png")
+            data = buffer.getvalue()
+            format = "png"
+    return data, width, height, format
+
+
+def get_image(source) -> Image:
+    """
+    Returns an openpyxl image for `source`, a path, bytes, a file-like object or a
+    Django storage file (i.e. a `FieldFile`), reusing the encoded image from the cache.
+    """
+    key = _cache_key(source)
+    data = None
+    if key is None:
+        data = _read(source)
+        key = ("content", hashlib.sha1(data, usedforsecurity=False).hexdigest())
+    cached = image_cache.get(key)
+    if cached is None:
+        cached = _load(data if data is not None else _read(source))
+        image_cache.set(key, cached)
+    return CachedImage(*cached)
@@ -0,0 +1,130 @@
+import threading
+
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class ExportUnavailable(APIException):
+    """
+    Raised when an export isn't admitted and `xlsx_export_limit_status` is 503, the
+    `wait` seconds are sent in the `Retry-After` header.
+    """
+
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Too many exports in progress, try again later."
+    default_code = "export_unavailable"
+
+    def __init__(self, detail=None, code=None, wait=None):
+        super().__init__(detail, code)
+        self.wait = wait
+
+
+class ExportTooLarge(APIException):
+    """
+    Raised when the estimated cost of an export is above `xlsx_refuse_threshold`.
+    """
+
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = "Export too large, select fewer rows or columns."
+    default_code = "export_too_large"
+
+
+def admits(count, active_cost, cost, max_concurrent=None, max_cost=None):
+    """
+    Whether an export of `cost` can start while `count` exports of `active_cost` run.
+    An export above `max_cost` on its own is only admitted when no other one runs.
+    """
+    if max_concurrent and count >= max_concurrent:
+        return False
+    if max_cost and count and active_cost + cost > max_cost:
+        return False
+    return True
+
+
+class ProcessExportLimiter:
+    """
+    Limits the exports running in the current process.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.count = 0
+        self.cost = 0
+
+    def acquire(self, cost, max_concurrent=None, max_cost=None):
+        with self.lock:
+            if not admits(self.count, self.cost, cost, max_concurrent, max_cost):
+                return False
+            self.count += 1
+            self.cost += cost
+            return True
+
+    def release(self, cost):
+        with self.lock:
+            self.count = max(self.count - 1, 0)
+            self.cost = max(self.cost - cost, 0)
+
+
+class CacheExportLimiter:
+    """
+    Limits the exports running across processes with counters in a Django cache,
+    which must support atomic `incr` (i.e. Redis or Memcached). Counters expire after
+    `timeout` seconds without a new export, so a crashed worker doesn't hold its
+    slot forever.
+    """
+
+    def __init__(self, scope, alias="default", timeout=600):
+        self.count_key = f"drf_excel:exports:{scope}:count"
+        self.cost_key = f"drf_excel:exports:{scope}:cost"
+        self.alias = alias
+        self.timeout = timeout
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def _incr(self, key, delta):
+        self.cache.add(key, 0, self.timeout)
+        try:
+            value = self.cache.incr(key, delta)
+        except ValueError:
+            # The counter expired in between
+            self.cache.add(key, 0, self.timeout)
+            value = self.cache.incr(key, delta)
+        self.cache.touch(key, self.timeout)
+        return value
+
+    def acquire(self, cost, max_concurrent=None, max_cost=None):
+        count = self._incr(self.count_key, 1)
+        active_cost = self._incr(self.cost_key, cost)
+        if admits(count - 1, active_cost - cost, cost, max_concurrent, max_cost):
+            return True
+        self.release(cost)
+        return False
+
+    def release(self, cost):
+        for key, delta in ((self.count_key, 1), (self.cost_key, cost)):
+            if self._incr(key, -delta) < 0:
+                self.cache.set(key, 0, self.timeout)
+
+
+_process_limiters = {}
+_process_limiters_lock = threading.Lock()
+
+
+def get_export_limiter(backend="process", scope="default", **kwargs):
+    """
+    Returns the limiter shared by the views of `scope`: `process` counts the exports
+    of the current process, `cache` the exports of all processes using the cache.
+    """
+    if backend == "cache":
+        return CacheExportLimiter(scope, **kwargs)
+    if backend != "process":
+        raise ValueError(
+            f"Invalid export limiter '{backend}', use 'process' or 'cache'."
+        )
+    with _process_limiters_lock:
+        if scope not in _process_limiters:
+            _process_limiters[scope] = ProcessExportLimiter()
+        return _process_limiters[scope]
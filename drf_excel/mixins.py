@@ -1,33 +1,691 @@
-from django.utils.encoding import escape_uri_path
-from rest_framework.response import Response
-
-
-class XLSXFileMixin:
-    """
-    Mixin which allows the override of the filename being
-    passed back to the user when the spreadsheet is downloaded.
-    """
-
-    filename = "export.xlsx"
-
-    def get_filename(self, request=None, *args, **kwargs):
-        """
-        Returns a custom filename for the spreadsheet.
-        """
-        return self.filename
-
-    def finalize_response(self, request, response, *args, **kwargs):
-        """
-        Return the response with the proper content disposition and the customized
-        filename instead of the browser default (or lack thereof).
-        """
-        response = super().finalize_response(request, response, *args, **kwargs)
-        if (
-            isinstance(response, Response)
-            and response.accepted_renderer.format == "xlsx"
-        ):
-            filename = self.get_filename(request, *args, **kwargs)
-            response["content-disposition"] = (
-                f"attachment; filename={escape_uri_path(filename)}"
-            )
-        return response
+import os
+import time
+
+from django.db import DatabaseError, models, transaction
+from django.db.models.functions import Length
+from django.http import HttpResponse
+from django.utils.encoding import escape_uri_path
+from django.utils.translation import get_language
+from rest_framework.decorators import action
+from rest_framework.exceptions import ParseError, Throttled
+from rest_framework.generics import ListAPIView, ListCreateAPIView
+from rest_framework.mixins import ListModelMixin
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from drf_excel.compiler import CompileError, XLSXRowSerializer, compile_serializer
+from drf_excel.limits import ExportTooLarge, ExportUnavailable, get_export_limiter
+from drf_excel.parsers import XLSXParser
+from drf_excel.progress import (
+    FINAL_PHASES,
+    CacheProgressSink,
+    ExportInProgress,
+    ExportProgress,
+    progress_key,
+)
+from drf_excel.querysets import (
+    optimize_queryset,
+    prune_serializer,
+    resolve_model_field,
+    resolve_source,
+)
+from drf_excel.renderers import XLSXRenderer
+from drf_excel.singleflight import CacheSingleFlight, SharedExport, export_fingerprint
+from drf_excel.utilities import get_setting
+
+
+class XLSXFileMixin:
+    """
+    Mixin which allows the override of the filename being
+    passed back to the user when the spreadsheet is downloaded.
+    """
+
+    filename = "export.xlsx"
+    xlsx_auto_width_from_db = False
+    # Automatically add select_related/prefetch_related/only() to export querysets
+    xlsx_optimize_queryset = True
+    # Per-view overrides of the computed relations and columns
+    xlsx_select_related = None
+    xlsx_prefetch_related = None
+    xlsx_only = None
+    xlsx_defer = None
+    # Query parameters selecting the exported columns, i.e. `?fields=title,author`
+    xlsx_fields_param = None
+    xlsx_exclude_param = None
+    # Serialize exported lists straight into rows of values, see `drf_excel.compiler`.
+    # Only done for the default `ListModelMixin.list`, other actions get the dicts
+    xlsx_compile_serializer = True
+    # Admission control of exports, disabled unless a limit is set:
+    # - `xlsx_max_concurrent_exports`: number of exports running at once
+    # - `xlsx_max_export_cost`: total estimated cost (rows x columns) of the running
+    #   exports, a single bigger export only runs when no other one does
+    xlsx_max_concurrent_exports = None
+    xlsx_max_export_cost = None
+    # `process` to limit exports per process, `cache` across processes
+    xlsx_export_limiter = "process"
+    xlsx_export_limiter_scope = "default"
+    xlsx_export_limiter_cache = "default"
+    # Seconds to wait for a slot before refusing the export
+    xlsx_export_queue_timeout = 0
+    # Status (429 or 503) and Retry-After seconds of refused exports
+    xlsx_export_limit_status = 429
+    xlsx_export_retry_after = 30
+    # Writing engine, `openpyxl`, `write_only` or `xlsxwriter`, defaulting to the
+    # `DRF_EXCEL_ENGINE` setting. Unless set, it's selected from the estimated cost:
+    # a streaming engine above `xlsx_write_only_threshold` (`xlsxwriter` when it's
+    # the default, else `write_only`), and the export is refused above
+    # `xlsx_refuse_threshold`.
+    xlsx_engine = None
+    xlsx_write_only_threshold = None
+    xlsx_refuse_threshold = None
+    # Query parameter with a client token to publish the export progress under, see
+    # `drf_excel.progress.ExportProgressView`
+    xlsx_progress_param = None
+    xlsx_progress_sink_class = CacheProgressSink
+    xlsx_progress_interval = 1.0
+    # Query parameter requesting a preview of the first `xlsx_preview_rows` rows of
+    # a list, i.e. `?preview=1`, or `xlsx_preview = True` to always export one
+    xlsx_preview_param = None
+    xlsx_preview = False
+    xlsx_preview_rows = 20
+    # Render identical exports requested at the same time once: the first request
+    # renders, the others wait up to `xlsx_single_flight_timeout` seconds for its
+    # result, shared through the Django cache named by `xlsx_single_flight_cache`
+    # and kept for `xlsx_single_flight_result_timeout` seconds
+    xlsx_single_flight = False
+    xlsx_single_flight_cache = "default"
+    xlsx_single_flight_timeout = 60
+    xlsx_single_flight_result_timeout = 10
+
+    def get_filename(self, request=None, *args, **kwargs):
+        """
+        Returns a custom filename for the spreadsheet.
+        """
+        return self.filename
+
+    def is_xlsx_export(self):
+        # Also true for the renderers sharing the columns of `XLSXRenderer`
+        request = getattr(self, "request", None)
+        renderer = getattr(request, "accepted_renderer", None)
+        return isinstance(renderer, XLSXRenderer)
+
+    def get_serializer(self, *args, **kwargs):
+        preview_rows = self.get_xlsx_preview_rows() if kwargs.get("many") else None
+        if preview_rows and "data" not in kwargs:
+            # Limited in the query, once filtered, ordered and paginated
+            if "instance" in kwargs:
+                kwargs["instance"] = kwargs["instance"][:preview_rows]
+            elif args:
+                args = (args[0][:preview_rows], *args[1:])
+        serializer = super().get_serializer(*args, **kwargs)
+        if "data" not in kwargs and self.is_xlsx_export():
+            # Don't compute the columns left out of the export
+            prune_serializer(serializer, self.get_xlsx_excluded_keys())
+            if kwargs.get("many") and self.should_compile_xlsx_serializer():
+                serializer = self.compile_xlsx_serializer(serializer)
+        return serializer
+
+    def should_compile_xlsx_serializer(self):
+        """
+        Whether the list serializer can be compiled, only when `serializer.data` goes
+        straight to the response: in the `list` action of `ListModelMixin`, not
+        overridden, called by a viewset or by the `get` of `ListAPIView`.
+        """
+        if not self.xlsx_compile_serializer:
+            return False
+        view = type(self)
+        if getattr(view, "list", None) is not ListModelMixin.list:
+            return False
+        action = getattr(self, "action", None)
+        if action is not None:
+            return action == "list"
+        return self.request.method == "GET" and getattr(view, "get", None) in (
+            ListAPIView.get,
+            ListCreateAPIView.get,
+        )
+
+    def compile_xlsx_serializer(self, serializer):
+        """
+        Returns a serializer emitting the exported rows as tuples of column values,
+        or `serializer` itself if it can't be compiled (i.e. it overrides
+        `to_representation` or has custom columns that aren't serializer fields).
+        """
+        keys = self.get_xlsx_export_keys(serializer.child)
+        row_color = "row_color" in keys
+        keys = [key for key in keys if key != "row_color"]
+        try:
+            row = compile_serializer(serializer.child, keys, row_color)
+        except CompileError:
+            return serializer
+        return XLSXRowSerializer(serializer.instance, row, keys, row_color)
+
+    def get_xlsx_export_keys(self, serializer=None):
+        """
+        Returns the flattened header keys of the exported columns, followed by the
+        keys of `xlsx_custom_cols`.
+        """
+        if serializer is None:
+            serializer = self.get_serializer_class()(
+                context=self.get_serializer_context()
+            )
+        renderer = XLSXRenderer()
+        renderer.ignore_headers = self.get_xlsx_excluded_keys()
+        keys = list(renderer._flatten_serializer_keys(serializer))
+        for key in getattr(self, "xlsx_custom_cols", {}):
+            if key not in keys:
+                keys.append(key)
+        return keys
+
+    def get_xlsx_excluded_keys(self):
+        """
+        Returns the flattened header keys left out of the export: the ignored headers
+        and the columns not selected by the `xlsx_fields_param` and
+        `xlsx_exclude_param` query parameters.
+        """
+        ignore_headers = list(getattr(self, "xlsx_ignore_headers", []))
+        request = getattr(self, "request", None)
+        if request is None:
+            return ignore_headers
+        fields = self._get_xlsx_param(request, self.xlsx_fields_param)
+        exclude = self._get_xlsx_param(request, self.xlsx_exclude_param)
+        if fields is None and exclude is None:
+            return ignore_headers
+
+        if getattr(self, "_xlsx_excluded_keys", None) is None:
+            renderer = XLSXRenderer()
+            renderer.ignore_headers = ignore_headers
+            serializer = self.get_serializer_class()(
+                context=self.get_serializer_context()
+            )
+            keys = list(renderer._flatten_serializer_keys(serializer))
+            self._xlsx_excluded_keys = ignore_headers + [
+                key
+                for key in keys
+                if (fields is not None and not self._match_xlsx_keys(key, fields))
+                or (exclude is not None and self._match_xlsx_keys(key, exclude))
+            ]
+            unknown = [
+                name
+                for name in (fields or []) + (exclude or [])
+                if not any(self._match_xlsx_keys(key, [name]) for key in keys)
+            ]
+            if unknown:
+                raise ParseError(f"Unknown export fields: {', '.join(unknown)}.")
+        return self._xlsx_excluded_keys
+
+    @staticmethod
+    def _get_xlsx_param(request, param):
+        if not param or param not in request.query_params:
+            return None
+        values = request.query_params.getlist(param)
+        return [
+            name
+            for value in values
+            for name in map(str.strip, value.split(","))
+            if name
+        ]
+
+    @staticmethod
+    def _match_xlsx_keys(key, names, key_sep="."):
+        # A nested serializer name selects all of its columns
+        return any(key == name or key.startswith(f"{name}{key_sep}") for name in names)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.is_xlsx_export():
+            self.start_xlsx_progress()
+            self.join_xlsx_export()
+            self.select_xlsx_engine()
+            self.acquire_xlsx_export()
+            progress = self.get_xlsx_progress()
+            if progress is not None:
+                progress.set_phase("serializing")
+
+    def get_xlsx_progress(self):
+        return getattr(self, "_xlsx_progress", None)
+
+    def start_xlsx_progress(self):
+        """
+        Start publishing the progress of the export when the request has a token in
+        the `xlsx_progress_param` query parameter. A token of an export still
+        running is refused, so repeated clicks don't start the export again.
+        """
+        param = self.xlsx_progress_param
+        token = self.request.query_params.get(param) if param else None
+        if not token:
+            return
+        sink = self.xlsx_progress_sink_class()
+        key = progress_key(self.request, token)
+        state = sink.get(key)
+        if state is not None and state["phase"] not in FINAL_PHASES:
+            raise ExportInProgress()
+        self._xlsx_progress = ExportProgress(sink, key, self.xlsx_progress_interval)
+        self._xlsx_progress.set_phase("queued")
+
+    def get_xlsx_export_fingerprint(self):
+        """
+        Returns the key of the content of the export: the view, the URL with its
+        query parameters (but the progress token), the format, the language and the
+        user. Override it to share the exports which don't depend on the user.
+        """
+        request = self.request
+        params = sorted(
+            (name, value)
+            for name, values in request.query_params.lists()
+            if name != self.xlsx_progress_param
+            for value in values
+        )
+        user = getattr(request, "user", None)
+        user_id = user.pk if user is not None and user.is_authenticated else None
+        return export_fingerprint(
+            f"{type(self).__module__}.{type(self).__qualname__}",
+            request.path,
+            params,
+            request.accepted_renderer.format,
+            get_language(),
+            user_id,
+        )
+
+    def join_xlsx_export(self):
+        """
+        With `xlsx_single_flight`, wait for an identical export already running and
+        send its result, raising `SharedExport`. This request renders the export when
+        it's the first one, when the first one failed or after waiting for
+        `xlsx_single_flight_timeout` seconds.
+        """
+        if not self.xlsx_single_flight:
+            return
+        flight = CacheSingleFlight(
+            self.get_xlsx_export_fingerprint(),
+            alias=self.xlsx_single_flight_cache,
+            timeout=self.xlsx_single_flight_timeout,
+            result_timeout=self.xlsx_single_flight_result_timeout,
+        )
+        deadline = time.monotonic() + self.xlsx_single_flight_timeout
+        while True:
+            result = flight.get()
+            if result is not None:
+                if result["content"] is None:
+                    return
+                progress = self.get_xlsx_progress()
+                if progress is not None:
+                    progress.finish()
+                raise SharedExport(self.get_shared_xlsx_response(result))
+            if flight.acquire():
+                self._xlsx_flight = flight
+                return
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            time.sleep(min(remaining, 0.1))
+
+    def get_shared_xlsx_response(self, result):
+        response = HttpResponse(result["content"])
+        for name, value in result["headers"]:
+            response[name] = value
+        response["X-XLSX-Shared"] = "true"
+        return response
+
+    def publish_xlsx_export(self, response, failed=False):
+        """
+        Share the rendered export with the requests waiting for it, or let them
+        render it on their own if it failed.
+        """
+        flight = getattr(self, "_xlsx_flight", None)
+        if flight is None:
+            return
+        self._xlsx_flight = None
+        if not failed and response.status_code == 200 and not response.streaming:
+            flight.publish(response.content, response.items())
+        else:
+            flight.publish()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, SharedExport):
+            return exc.response
+        try:
+            return super().handle_exception(exc)
+        except Exception:
+            # Re-raised errors skip `finalize_response`
+            self.abort_xlsx_export()
+            raise
+
+    def abort_xlsx_export(self):
+        """
+        Release the export slot and the single flight lock, and mark the progress as
+        failed, when the view raised an error without a response.
+        """
+        progress = self.get_xlsx_progress()
+        if progress is not None and progress.phase not in FINAL_PHASES:
+            progress.finish(failed=True)
+        self.publish_xlsx_export(None, failed=True)
+        self.release_xlsx_export()
+
+    def get_xlsx_engine(self):
+        return getattr(self, "_xlsx_engine", None) or get_setting("ENGINE", "openpyxl")
+
+    def select_xlsx_engine(self):
+        """
+        Pick the cheapest suitable engine from the estimated cost of the export, or
+        refuse it. The decision is sent in the `X-XLSX-Engine` response header.
+        """
+        write_only_threshold = self.xlsx_write_only_threshold
+        refuse_threshold = self.xlsx_refuse_threshold
+        if self.xlsx_engine or (not write_only_threshold and not refuse_threshold):
+            return
+        cost = self.get_xlsx_export_cost()
+        if refuse_threshold and cost > refuse_threshold:
+            self._xlsx_engine = "refused"
+            self.refuse_xlsx_export(cost)
+        elif write_only_threshold and cost > write_only_threshold:
+            streaming = get_setting("ENGINE") == "xlsxwriter"
+            self._xlsx_engine = "xlsxwriter" if streaming else "write_only"
+        else:
+            self._xlsx_engine = get_setting("ENGINE", "openpyxl")
+
+    def refuse_xlsx_export(self, cost):
+        """
+        Called for exports above `xlsx_refuse_threshold`. Override it to start a
+        background job instead, raising an exception with the response to send.
+        """
+        raise ExportTooLarge()
+
+    def get_xlsx_export_cost(self):
+        if getattr(self, "_xlsx_export_cost", None) is None:
+            self._xlsx_export_cost = self.estimate_xlsx_export_cost()
+        return self._xlsx_export_cost
+
+    def estimate_xlsx_export_cost(self):
+        """
+        Returns the estimated cost of the export, its number of rows (a cheap
+        `count()` of the queryset, bounded by the page size) times its columns.
+        """
+        lookup_url_kwarg = getattr(self, "lookup_url_kwarg", None) or getattr(
+            self, "lookup_field", None
+        )
+        if lookup_url_kwarg and lookup_url_kwarg in self.kwargs:
+            rows = 1
+        else:
+            rows = self.filter_queryset(self.get_queryset()).count()
+            get_page_size = getattr(self.paginator, "get_page_size", None)
+            page_size = get_page_size(self.request) if get_page_size else None
+            if page_size:
+                rows = min(rows, page_size)
+            preview_rows = self.get_xlsx_preview_rows()
+            if preview_rows:
+                rows = min(rows, preview_rows)
+        return rows * len(self.get_xlsx_export_keys())
+
+    def acquire_xlsx_export(self):
+        """
+        Wait for the export to be admitted by the limiter, for up to
+        `xlsx_export_queue_timeout` seconds, or refuse it with a `Retry-After`.
+        """
+        max_concurrent = self.xlsx_max_concurrent_exports
+        max_cost = self.xlsx_max_export_cost
+        if not max_concurrent and not max_cost:
+            return
+        cost = self.get_xlsx_export_cost() if max_cost else 0
+        kwargs = {}
+        if self.xlsx_export_limiter == "cache":
+            kwargs["alias"] = self.xlsx_export_limiter_cache
+        limiter = get_export_limiter(
+            self.xlsx_export_limiter, self.xlsx_export_limiter_scope, **kwargs
+        )
+
+        deadline = time.monotonic() + self.xlsx_export_queue_timeout
+        while not limiter.acquire(cost, max_concurrent, max_cost):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                wait = self.xlsx_export_retry_after
+                if self.xlsx_export_limit_status == 503:
+                    raise ExportUnavailable(wait=wait)
+                raise Throttled(wait=wait, detail="Too many exports in progress.")
+            time.sleep(min(remaining, 0.1))
+        self._xlsx_export_slot = (limiter, cost)
+
+    def release_xlsx_export(self, *args):
+        slot = getattr(self, "_xlsx_export_slot", None)
+        if slot is not None:
+            self._xlsx_export_slot = None
+            limiter, cost = slot
+            limiter.release(cost)
+
+    def get_xlsx_preview_rows(self):
+        """
+        Returns the number of rows of a preview export, or `None` for a full one.
+        Details are never previewed.
+        """
+        if not self.is_xlsx_export():
+            return None
+        # Plain `APIView`s have no lookup
+        lookup_url_kwarg = getattr(self, "lookup_url_kwarg", None) or getattr(
+            self, "lookup_field", None
+        )
+        if lookup_url_kwarg and lookup_url_kwarg in self.kwargs:
+            return None
+        preview = self.xlsx_preview
+        param = self.xlsx_preview_param
+        if not preview and param and param in self.request.query_params:
+            value = self.request.query_params[param]
+            preview = value.lower() not in ("0", "false", "no")
+        return self.xlsx_preview_rows if preview else None
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.xlsx_optimize_queryset and self.is_xlsx_export():
+            queryset = self.optimize_xlsx_queryset(queryset)
+        return queryset
+
+    def optimize_xlsx_queryset(self, queryset):
+        """
+        Add the joins, prefetches and column restrictions needed to export the
+        serializer fields without a query per row. Columns of ignored and write only
+        fields are deferred.
+        """
+        renderer = XLSXRenderer()
+        renderer.ignore_headers = self.get_xlsx_excluded_keys()
+        # The whole serializer, to resolve the sources of the excluded fields
+        serializer = self.get_serializer_class()(context=self.get_serializer_context())
+        keys = renderer._flatten_serializer_keys(serializer)
+        excluded_keys = [
+            key for key in renderer._serializer_fields(serializer) if key not in keys
+        ]
+        return optimize_queryset(
+            queryset,
+            serializer,
+            keys,
+            select_related=self.xlsx_select_related,
+            prefetch_related=self.xlsx_prefetch_related,
+            only=self.xlsx_only,
+            excluded_keys=excluded_keys,
+            defer=self.xlsx_defer,
+        )
+
+    def get_xlsx_column_lengths(self, fields_dict):
+        """
+        Returns the maximum length of text columns computed with a single database
+        aggregate, used by the `auto` column width. Only enabled when
+        `xlsx_auto_width_from_db` is set.
+        """
+        if not self.xlsx_auto_width_from_db or not hasattr(self, "get_queryset"):
+            return {}
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.get_serializer()
+        aggregates = {}
+        for index, key in enumerate(fields_dict):
+            _, source_attrs = resolve_source(serializer, key)
+            if not source_attrs:
+                continue
+            lookup, model_field = resolve_model_field(queryset.model, source_attrs)
+            if isinstance(model_field, (models.CharField, models.TextField)):
+                aggregates[key] = (f"xlsx_len_{index}", models.Max(Length(lookup)))
+        if not aggregates:
+            return {}
+        result = queryset.order_by().aggregate(**dict(aggregates.values()))
+        return {key: result[alias] or 0 for key, (alias, _) in aggregates.items()}
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        """
+        Return the response with the proper content disposition and the customized
+        filename instead of the browser default (or lack thereof).
+        """
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if isinstance(response, Response) and isinstance(
+            response.accepted_renderer, XLSXRenderer
+        ):
+            filename = self.get_filename(request, *args, **kwargs)
+            export_format = response.accepted_renderer.format
+            if export_format != "xlsx":
+                # i.e. `export.parquet` for `ParquetRenderer`
+                filename = f"{os.path.splitext(filename)[0]}.{export_format}"
+            response["content-disposition"] = (
+                f"attachment; filename={escape_uri_path(filename)}"
+            )
+        engine = getattr(self, "_xlsx_engine", None) or self.xlsx_engine
+        if engine and self.is_xlsx_export():
+            response["X-XLSX-Engine"] = engine
+        cost = getattr(self, "_xlsx_export_cost", None)
+        if cost is not None:
+            response["X-XLSX-Estimated-Cost"] = str(cost)
+        preview_rows = self.get_xlsx_preview_rows()
+        if preview_rows:
+            response["X-XLSX-Preview"] = str(preview_rows)
+        progress = self.get_xlsx_progress()
+        if progress is not None and response.status_code >= 400:
+            progress.finish(failed=True)
+        if getattr(self, "_xlsx_flight", None) is not None:
+            self._after_xlsx_render(response, self.publish_xlsx_export)
+        if getattr(self, "_xlsx_export_slot", None) is not None:
+            self._after_xlsx_render(response, self.release_xlsx_export)
+        return response
+
+    def _after_xlsx_render(self, response, callback):
+        """
+        Call `callback(response, failed)` once the response, and so the workbook, is
+        rendered, or when rendering it raised, which skips post-render callbacks.
+        """
+        if not isinstance(response, Response) or response.is_rendered:
+            callback(response, False)
+            return
+        render = response.render
+
+        def render_xlsx():
+            # Back to the method of the class, so the response can still be pickled
+            del response.render
+            try:
+                rendered = render()
+            except Exception:
+                callback(response, True)
+                raise
+            callback(response, False)
+            return rendered
+
+        response.render = render_xlsx
+
+
+class XLSXImportMixin:
+    """
+    Mixin adding an `import` action to a viewset. The rows of an uploaded spreadsheet
+    are validated in batches with the view's serializer and saved with
+    `bulk_create`, or `bulk_update` for rows matching an existing object on
+    `xlsx_import_key`. Invalid rows are collected in a report.
+    """
+
+    xlsx_import_batch_size = 500
+    xlsx_import_key = None
+    xlsx_import_max_errors = 100
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="import",
+        parser_classes=[XLSXParser],
+        renderer_classes=[JSONRenderer],
+    )
+    def xlsx_import(self, request, *args, **kwargs):
+        return Response(self.import_rows(request.data))
+
+    def import_rows(self, rows):
+        """
+        Validate and save `rows`, returning a report with the number of created and
+        updated objects and the errors of the invalid rows.
+        """
+        report = {"created": 0, "updated": 0, "error_count": 0, "errors": []}
+        batch = []
+        for index, row in enumerate(rows, start=1):
+            # Report sheet row numbers when rows come from `XLSXParser`
+            batch.append((getattr(rows, "row_number", index), row))
+            if len(batch) >= self.xlsx_import_batch_size:
+                self._import_batch(batch, report)
+                batch = []
+        if batch:
+            self._import_batch(batch, report)
+        return report
+
+    def _add_import_error(self, report, row_number, errors):
+        report["error_count"] += 1
+        if len(report["errors"]) < self.xlsx_import_max_errors:
+            report["errors"].append({"row": row_number, "errors": errors})
+
+    def _import_batch(self, batch, report):
+        queryset = self.get_queryset()
+        model = queryset.model
+        key = self.xlsx_import_key
+        concrete_fields = {
+            field.name
+            for field in model._meta.concrete_fields
+            if not field.primary_key or field.name == key
+        }
+
+        existing = {}
+        if key:
+            keys = {row[key] for _, row in batch if row.get(key) is not None}
+            existing = {
+                str(getattr(obj, key)): obj
+                for obj in queryset.filter(**{f"{key}__in": keys})
+            }
+
+        to_create = {}
+        to_update = {}
+        updated_fields = set()
+        for row_number, row in batch:
+            row_key = str(row[key]) if key and row.get(key) is not None else None
+            instance = existing.get(row_key)
+            serializer = self.get_serializer(instance, data=row)
+            if not serializer.is_valid():
+                self._add_import_error(report, row_number, serializer.errors)
+                continue
+            values = {
+                name: value
+                for name, value in serializer.validated_data.items()
+                if name in concrete_fields
+            }
+            if instance is None:
+                obj = model(**values)
+                # Rows sharing a key in the same batch update the pending object
+                to_create[row_key if row_key is not None else id(obj)] = obj
+                if row_key is not None:
+                    existing[row_key] = obj
+            else:
+                for name, value in values.items():
+                    setattr(instance, name, value)
+                updated_fields.update(values)
+                if instance.pk is not None:
+                    to_update[instance.pk] = instance
+
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create(list(to_create.values()))
+                if to_update and updated_fields:
+                    model.objects.bulk_update(
+                        list(to_update.values()), sorted(updated_fields)
+                    )
+        except DatabaseError as exc:
+            first_row, last_row = batch[0][0], batch[-1][0]
+            self._add_import_error(
+                report, f"{first_row}-{last_row}", {"non_field_errors": [str(exc)]}
+            )
+            return
+        report["created"] += len(to_create)
+        report["updated"] += len(to_update)
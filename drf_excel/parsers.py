@@ -0,0 +1,192 @@
+import datetime
+import shutil
+from tempfile import SpooledTemporaryFile
+
+from rest_framework.exceptions import ParseError
+from rest_framework.fields import (
+    BooleanField,
+    DateField,
+    ListField,
+    TimeField,
+)
+from rest_framework.parsers import BaseParser
+
+from drf_excel.renderers import XLSXRenderer
+from drf_excel.utilities import ESCAPE_CHARS, get_attribute, get_setting
+
+# Uploads are spooled to a temporary file past this size, openpyxl needs a seekable
+# file but the whole upload shouldn't be kept in memory.
+SPOOL_MAX_SIZE = 10 * 1024 * 1024
+
+
+class XLSXRowIterator:
+    """
+    Lazy iterator over the rows of an uploaded sheet, yielding nested dicts keyed like
+    the serializer. `row_number` is the sheet row of the last yielded dict.
+    """
+
+    def __init__(self, workbook, file, columns, header_row):
+        self.workbook = workbook
+        self.file = file
+        self.columns = columns
+        self.header_row = header_row
+        self.row_number = header_row
+        self._rows = None
+
+    def __iter__(self):
+        if self._rows is None:
+            self._rows = self._iter_rows()
+        return self._rows
+
+    def __next__(self):
+        return next(iter(self))
+
+    def _iter_rows(self):
+        try:
+            sheet = self.workbook.worksheets[0]
+            for row_number, values in enumerate(
+                sheet.iter_rows(min_row=self.header_row + 1, values_only=True),
+                start=self.header_row + 1,
+            ):
+                row = self._make_row(values)
+                if row:
+                    self.row_number = row_number
+                    yield row
+        finally:
+            self.close()
+
+    def _make_row(self, values):
+        row = {}
+        if all(value is None for value in values):
+            return row
+        for index, (path, parse) in self.columns.items():
+            value = parse(values[index] if index < len(values) else None)
+            if value is None:
+                continue
+            # Rebuild nested dicts from `parent.child` keys
+            target = row
+            for part in path[:-1]:
+                target = target.setdefault(part, {})
+            target[path[-1]] = value
+        return row
+
+    def close(self):
+        self.workbook.close()
+        self.file.close()
+
+
+class XLSXParser(BaseParser):
+    """
+    Parser for Excel spreadsheet (xlsx) uploads, matching the layout written by
+    `XLSXRenderer`: the column headers (keys, labels or custom titles of the view)
+    are mapped back to the serializer keys.
+    """
+
+    media_type = XLSXRenderer.media_type
+    renderer_class = XLSXRenderer
+    # Number of rows searched for the column header, to skip the header title
+    header_search_rows = 10
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        view = parser_context.get("view")
+        if stream is None or view is None:
+            raise ParseError("XLSX parse error - no data or view.")
+
+        from openpyxl import load_workbook
+
+        file = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        shutil.copyfileobj(stream, file)
+        file.seek(0)
+        try:
+            workbook = load_workbook(file, read_only=True, data_only=True)
+        except Exception as exc:
+            file.close()
+            raise ParseError(f"XLSX parse error - {exc}") from exc
+
+        header_map = self.get_header_map(view)
+        header_row, columns = self._find_header(workbook, header_map)
+        if header_row is None:
+            workbook.close()
+            file.close()
+            raise ParseError("XLSX parse error - no column header found.")
+        return XLSXRowIterator(workbook, file, columns, header_row)
+
+    def get_header_map(self, view):
+        """
+        Map every accepted column title to its serializer key and field.
+        """
+        renderer = self.renderer_class()
+        renderer.ignore_headers = getattr(view, "xlsx_ignore_headers", [])
+        serializer = view.get_serializer()
+        fields_dict = renderer._serializer_fields(serializer)
+        keys = renderer._flatten_serializer_keys(serializer)
+        labels = renderer._flatten_serializer_keys(serializer, use_labels=True)
+
+        header_map = {}
+        for key in keys:
+            header_map[str(key)] = key
+            header_map[str(labels[key])] = key
+        column_header = get_attribute(view, "column_header", {})
+        for title, key in zip(column_header.get("titles", []), keys):
+            header_map[str(title)] = key
+
+        boolean_display = getattr(view, "xlsx_boolean_labels", None) or get_setting(
+            "BOOLEAN_DISPLAY"
+        )
+        list_sep = renderer.list_sep
+        return {
+            title: (
+                key,
+                self._value_parser(fields_dict[key], boolean_display, list_sep),
+            )
+            for title, key in header_map.items()
+        }
+
+    def _find_header(self, workbook, header_map, key_sep="."):
+        sheet = workbook.worksheets[0]
+        for row_number, values in enumerate(
+            sheet.iter_rows(max_row=self.header_search_rows, values_only=True),
+            start=1,
+        ):
+            columns = {}
+            for index, title in enumerate(values):
+                if title is not None and str(title) in header_map:
+                    key, parse = header_map[str(title)]
+                    columns[index] = (tuple(key.split(key_sep)), parse)
+            if columns:
+                return row_number, columns
+        return None, None
+
+    @staticmethod
+    def _value_parser(field, boolean_display, list_sep):
+        """
+        Return a function reverting the conversions done when rendering a value.
+        """
+        boolean_values = (
+            {str(label): value for value, label in boolean_display.items()}
+            if boolean_display
+            else {}
+        )
+
+        def parse(value):
+            if value is None:
+                # Empty lists are written as empty cells
+                return [] if isinstance(field, ListField) else None
+            if isinstance(value, str):
+                # Undo the escaping of potentially malicious values
+                if value.startswith("'") and value[1:].startswith(ESCAPE_CHARS):
+                    value = value[1:]
+                if isinstance(field, BooleanField):
+                    return boolean_values.get(value, value)
+                if isinstance(field, ListField):
+                    return value.split(list_sep) if value else []
+            elif isinstance(value, datetime.datetime):
+                # Excel has no date or time only types
+                if isinstance(field, TimeField):
+                    return value.time()
+                if isinstance(field, DateField):
+                    return value.date()
+            return value
+
+        return parse
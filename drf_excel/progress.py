@@ -0,0 +1,106 @@
+import time
+
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+# Phases after which an export isn't running anymore
+FINAL_PHASES = ("done", "failed")
+
+
+class ExportInProgress(APIException):
+    """
+    Raised when an export is requested again with the progress token of an export
+    still running.
+    """
+
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "This export is already in progress."
+    default_code = "export_in_progress"
+
+
+class CacheProgressSink:
+    """
+    Stores the progress of exports in a Django cache.
+    """
+
+    def __init__(self, alias="default", timeout=3600):
+        self.alias = alias
+        self.timeout = timeout
+
+    def _key(self, key):
+        return f"drf_excel:progress:{key}"
+
+    def publish(self, key, state):
+        caches[self.alias].set(self._key(key), state, self.timeout)
+
+    def get(self, key):
+        return caches[self.alias].get(self._key(key))
+
+
+def progress_key(request, token):
+    """
+    Returns the key of the progress of `token`, scoped to the authenticated user.
+    """
+    user = getattr(request, "user", None)
+    user_id = user.pk if user is not None and user.is_authenticated else "anonymous"
+    return f"{user_id}:{token}"
+
+
+class ExportProgress:
+    """
+    Publishes the phase and the number of rows written of an export to a sink,
+    at most every `interval` seconds while rows are written.
+    """
+
+    def __init__(self, sink, key, interval=1.0):
+        self.sink = sink
+        self.key = key
+        self.interval = interval
+        self.phase = None
+        self.rows = 0
+        self.total = None
+        self.published_at = None
+
+    @property
+    def state(self):
+        return {"phase": self.phase, "rows": self.rows, "total": self.total}
+
+    def publish(self):
+        self.published_at = time.monotonic()
+        self.sink.publish(self.key, self.state)
+
+    def set_phase(self, phase, total=None):
+        self.phase = phase
+        if total is not None:
+            self.total = total
+        self.publish()
+
+    def advance(self, rows):
+        self.rows += rows
+        if time.monotonic() - self.published_at >= self.interval:
+            self.publish()
+
+    def finish(self, failed=False):
+        if failed:
+            self.set_phase("failed")
+        else:
+            self.rows = self.total if self.total is not None else self.rows
+            self.set_phase("done")
+
+
+class ExportProgressView(APIView):
+    """
+    Returns the progress of the export started with the `token` URL argument, i.e.
+    `path("exports/<str:token>/progress/", ExportProgressView.as_view())`.
+    """
+
+    sink_class = CacheProgressSink
+
+    def get(self, request, token, *args, **kwargs):
+        state = self.sink_class().get(progress_key(request, token))
+        if state is None:
+            raise NotFound("Unknown export.")
+        return Response(state)
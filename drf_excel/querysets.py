@@ -0,0 +1,246 @@
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.relations import ManyRelatedField, RelatedField
+from rest_framework.serializers import ListSerializer, ModelSerializer, Serializer
+
+
+def resolve_source(serializer, key, key_sep="."):
+    """
+    Return the bound field of a flattened header key (i.e. `parent.child`) and its full
+    list of source attributes, starting from the root serializer.
+    """
+    source_attrs = []
+    field = serializer
+    for name in key.split(key_sep):
+        fields = getattr(field, "fields", None)
+        if fields is None or name not in fields:
+            return None, None
+        field = fields[name]
+        source_attrs.extend(field.source_attrs)
+    return field, source_attrs
+
+
+def _serializer_fields_of(field):
+    # Fields of a nested serializer, including the child of a `many=True` one
+    if isinstance(field, ListSerializer):
+        field = field.child
+    return getattr(field, "fields", None)
+
+
+def prune_serializer(serializer, keys, key_sep="."):
+    """
+    Remove the flattened header `keys` (i.e. `parent.child`) and every write only
+    field from `serializer`, so they aren't computed for each exported row.
+    """
+    keys = set(keys)
+
+    def prune(field, parent_key):
+        fields = _serializer_fields_of(field)
+        if fields is None:
+            return
+        for name, child in list(fields.items()):
+            key = f"{parent_key}{key_sep}{name}" if parent_key else name
+            if key in keys or child.write_only:
+                del fields[name]
+                continue
+            prune(child, key)
+            child_fields = _serializer_fields_of(child)
+            if child_fields is not None and not child_fields:
+                # Every column of the nested serializer was left out
+                del fields[name]
+
+    prune(serializer, "")
+    return serializer
+
+
+def resolve_model_field(model, source_attrs):
+    """
+    Follow `source_attrs` through the model relations. Returns the ORM lookup path
+    and the final model field, or `(None, None)` if the source isn't a model field.
+    """
+    lookups = []
+    model_field = None
+    for attr in source_attrs:
+        if model is None:
+            return None, None
+        try:
+            model_field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            return None, None
+        lookups.append(attr)
+        model = model_field.related_model
+    if model_field is None:
+        return None, None
+    return "__".join(lookups), model_field
+
+
+class QueryPlan:
+    """
+    Relations to join or prefetch, and columns to load, to serialize a queryset
+    without a query per row.
+    """
+
+    def __init__(self):
+        self.select_related = set()
+        self.prefetch_related = set()
+        self.only = set()
+        self.defer = set()
+        # Whether every field could be resolved to model fields, required for `only`
+        self.complete = True
+
+    def add_field(self, model, field, source_attrs, prefix=(), prefetch=False):
+        """
+        Record the relations and columns used by a serializer field, following its
+        `source_attrs` from `model`.
+        """
+        if not source_attrs:
+            # Fields with `source="*"` use the whole object
+            self.complete = False
+            return
+        path = list(prefix)
+        model_field = None
+        for index, attr in enumerate(source_attrs):
+            try:
+                model_field = model._meta.get_field(attr)
+            except (AttributeError, FieldDoesNotExist):
+                # Method or property, we can't know which columns it reads
+                self.complete = False
+                return
+            path.append(attr)
+            lookup = "__".join(path)
+            if not model_field.is_relation:
+                if not prefetch:
+                    self.only.add(lookup)
+                continue
+            if model_field.many_to_many or model_field.one_to_many:
+                prefetch = True
+            is_last = index == len(source_attrs) - 1
+            if is_last and self._pk_only(field, prefetch):
+                # Only the foreign key column is needed, i.e. PrimaryKeyRelatedField
+                self.only.add(lookup)
+                return
+            if prefetch:
+                self.prefetch_related.add(lookup)
+            else:
+                self.select_related.add(lookup)
+            model = model_field.related_model
+
+        if not model_field.is_relation:
+            return
+        if isinstance(field, ListSerializer):
+            # Nested serializer with many=True: its relations are prefetched too
+            for child_field in field.child.fields.values():
+                if not child_field.write_only:
+                    self.add_field(
+                        model, child_field, child_field.source_attrs, path, True
+                    )
+        elif not isinstance(field, ManyRelatedField):
+            # Related object used as a whole, i.e. StringRelatedField
+            self.complete = False
+
+    def defer_field(self, model, source_attrs):
+        """
+        Defer the column of a field left out of the export, if it's a column of
+        `model` or of a joined relation.
+        """
+        lookup, model_field = resolve_model_field(model, source_attrs)
+        if (
+            model_field is None
+            or model_field.is_relation
+            or model_field.primary_key
+            or not model_field.concrete
+        ):
+            return
+        relation = "__".join(source_attrs[:-1])
+        if relation and relation not in self.select_related:
+            return
+        self.defer.add(lookup)
+
+    @staticmethod
+    def _pk_only(field, prefetch):
+        return (
+            not prefetch
+            and isinstance(field, RelatedField)
+            and field.use_pk_only_optimization()
+        )
+
+    def apply(
+        self,
+        queryset,
+        select_related=None,
+        prefetch_related=None,
+        only=None,
+        defer=None,
+    ):
+        """
+        Apply the plan to `queryset`, explicit arguments take precedence over the
+        computed relations and columns.
+        """
+        if select_related is None:
+            select_related = sorted(self.select_related)
+        if prefetch_related is None:
+            prefetch_related = sorted(self.prefetch_related)
+        if only is None:
+            only = (
+                sorted(self.only)
+                if self.complete
+                and not prefetch_related
+                and not _loads_custom_columns(queryset)
+                else []
+            )
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        if defer is None:
+            defer = sorted(self.defer - self.only)
+        if only:
+            queryset = queryset.only(*only)
+        elif defer:
+            queryset = queryset.defer(*defer)
+        return queryset
+
+
+def _loads_custom_columns(queryset):
+    # Joins or column restrictions of the view's queryset may conflict with `only`,
+    # i.e. a relation can't be both deferred and traversed with select_related
+    query = queryset.query
+    return bool(query.select_related) or query.deferred_loading != (frozenset(), True)
+
+
+def _uses_custom_representation(serializer):
+    return type(serializer).to_representation not in (
+        Serializer.to_representation,
+        ModelSerializer.to_representation,
+    )
+
+
+def optimize_queryset(
+    queryset,
+    serializer,
+    keys,
+    select_related=None,
+    prefetch_related=None,
+    only=None,
+    excluded_keys=(),
+    defer=None,
+):
+    """
+    Add the `select_related`, `prefetch_related` and `only` needed to export the
+    flattened header `keys` of `serializer` from `queryset`. The columns of
+    `excluded_keys` are deferred when `only` can't be used.
+    """
+    plan = QueryPlan()
+    for key in keys:
+        field, source_attrs = resolve_source(serializer, key)
+        if field is None:
+            continue
+        plan.add_field(queryset.model, field, source_attrs)
+    if _uses_custom_representation(serializer):
+        # Custom representations may read any attribute of the object
+        plan.complete = False
+    else:
+        for key in excluded_keys:
+            _, source_attrs = resolve_source(serializer, key)
+            if source_attrs:
+                plan.defer_field(queryset.model, source_attrs)
+    return plan.apply(queryset, select_related, prefetch_related, only, defer)
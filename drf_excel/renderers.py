@@ -1,14 +1,15 @@
 import json
+import warnings
+import zipfile
 from collections.abc import Iterable, MutableMapping
+from copy import copy, deepcopy
+from functools import partial
 from tempfile import TemporaryFile
+from typing import TYPE_CHECKING, Any
 
+from django.utils.encoding import escape_uri_path
 from django.utils.functional import Promise
-from openpyxl import Workbook
-from openpyxl.drawing.image import Image
-from openpyxl.styles import PatternFill
-from openpyxl.utils import get_column_letter
-from openpyxl.worksheet.views import SheetView
-from openpyxl.writer.excel import save_workbook
+from django.utils.translation import get_language
 from rest_framework.fields import (
     BooleanField,
     DateField,
@@ -21,16 +22,63 @@ from rest_framework.fields import (
     TimeField,
 )
 from rest_framework.renderers import BaseRenderer
-from rest_framework.serializers import Serializer
-
-from drf_excel.fields import (
-    XLSXBooleanField,
-    XLSXDateField,
-    XLSXField,
-    XLSXListField,
-    XLSXNumberField,
+from rest_framework.serializers import ListSerializer, Serializer
+
+from drf_excel.cache import LRUCache
+from drf_excel.utilities import (
+    XLSXStyle,
+    get_attribute,
+    get_setting,
+    is_batch_formatter,
+    set_cell_style,
+)
+
+# openpyxl, and the modules using it, are imported on the first render, so listing
+# the renderer in `DEFAULT_RENDERER_CLASSES` doesn't slow down the startup
+if TYPE_CHECKING:
+    from drf_excel.backends import WorkbookBackend
+    from drf_excel.fields import XLSXField
+
+# Maximum number of rows of an Excel worksheet
+EXCEL_MAX_ROWS = 1048576
+
+ENGINES = ("openpyxl", "write_only", "xlsxwriter")
+
+# Renderer attributes computed from the view only, reused across requests when the
+# view sets `xlsx_cache_template`
+TEMPLATE_ATTRS = (
+    "header",
+    "use_header",
+    "tab_title",
+    "header_style",
+    "column_header",
+    "column_header_style",
+    "column_titles_display",
+    "ignore_headers",
+    "boolean_display",
+    "column_data_styles",
+    "column_styles",
+    "custom_cols",
+    "custom_mappings",
+    "fields_dict",
+    "combined_header_dict",
+    "column_accessors",
+    "body",
+    "body_style",
+    "sheet_view_options",
+    "table",
+    "child_sheets",
+    "child_accessors",
 )
-from drf_excel.utilities import XLSXStyle, get_attribute, set_cell_style
+template_cache = LRUCache(maxsize=64)
+
+# Marks a column without a value in a row, written as an empty unstyled cell
+_MISSING = object()
+
+
+def _mapped_value(mapped_value, value):
+    # Custom mapping returning the value already computed by a batch formatter
+    return mapped_value
 
 
 class XLSXRenderer(BaseRenderer):
@@ -50,6 +98,21 @@ class XLSXRenderer(BaseRenderer):
     list_sep = ", "
     body_style = None
     sheet_view_options = {}
+    auto_width = None
+    column_accessors = []
+    column_styles = {}
+    compiled_row_color = False
+    ws = None
+    # Whether the cells of a column are written by one field (see `_column_field`)
+    shared_column_fields = True
+    column_fields = []
+    # Style arrays of the columns when `body` sets `sheet_defaults`
+    column_cell_styles = None
+    table = None
+    child_sheets = []
+    child_rows_per_sheet = None
+    child_accessors = []
+    preview = False
 
     def render(self, data, accepted_media_type=None, renderer_context=None):
         """
@@ -61,46 +124,211 @@ class XLSXRenderer(BaseRenderer):
         if not self._check_validation_data(data):
             return json.dumps(data)
 
-        wb = Workbook()
-        self.ws = wb.active
-
         results = data["results"] if "results" in data else data
 
         drf_view = renderer_context.get("view")
 
+        self._load_template(drf_view, has_results=bool(len(results)))
+
+        # Set column width
+        self.auto_width = None
+        self.auto_width_db_lengths = None
+        if self.column_header.get("column_width", 20) == "auto":
+            self.auto_width_db_lengths = self._get_db_column_lengths(drf_view)
+
+        # Number of rows handed at once to batch formatters, `None` for the whole column
+        batch_size = getattr(drf_view, "xlsx_batch_size", 1000)
+
+        # What to do when the results don't fit in a single sheet: roll over to
+        # "Report (2)", "Report (3)"... sheets, or to several files packaged in a zip.
+        overflow = getattr(drf_view, "xlsx_overflow", "sheets")
+        if overflow not in (None, "sheets", "zip"):
+            raise ValueError(
+                f"Invalid xlsx_overflow '{overflow}', use 'sheets', 'zip' or None."
+            )
+        max_rows = getattr(drf_view, "xlsx_max_rows", EXCEL_MAX_ROWS)
+        header_rows = 2 if self.use_header else 1
+        rows_per_sheet = max_rows - header_rows if overflow else None
+        # Child sheets only have a column header, and roll over to "Lines (2)"...
+        self.child_rows_per_sheet = max_rows - 1 if overflow else None
+
+        # `openpyxl` keeps the workbook in memory, `write_only` and `xlsxwriter`
+        # stream the rows
+        self.engine = get_attribute(
+            drf_view, "xlsx_engine", get_setting("ENGINE", "openpyxl")
+        )
+        if self.engine not in ENGINES:
+            raise ValueError(
+                f"Invalid xlsx_engine '{self.engine}', use 'openpyxl', 'write_only' "
+                "or 'xlsxwriter'."
+            )
+
+        # Sheets of a preview of the first rows, see `XLSXFileMixin`
+        get_preview_rows = getattr(drf_view, "get_xlsx_preview_rows", None)
+        self.preview = bool(get_preview_rows and get_preview_rows())
+
+        if isinstance(results, dict):
+            results = [results]
+        get_progress = getattr(drf_view, "get_xlsx_progress", None)
+        progress = get_progress() if get_progress else None
+        try:
+            return self._write_workbook(
+                results,
+                renderer_context,
+                batch_size,
+                overflow,
+                header_rows,
+                rows_per_sheet,
+                progress,
+            )
+        except Exception:
+            if progress is not None:
+                progress.finish(failed=True)
+            raise
+
+    def _write_workbook(
+        self,
+        results,
+        renderer_context,
+        batch_size,
+        overflow,
+        header_rows,
+        rows_per_sheet,
+        progress=None,
+    ):
+        """
+        Write the sheets of `results`, returning the saved workbook, or the zip of
+        the workbooks when they overflow.
+        """
+        self.backend = self._get_backend()
+        self.wb = self._new_workbook()
+        self.workbook_parts = []
+        self.sheet_count = 1
+        self._init_column_fields()
+        self._start_sheet(self._new_sheet(self._sheet_title()))
+        self._start_child_sheets()
+        row_count = header_rows
+        if progress is not None:
+            progress.set_phase("writing", total=len(results))
+        if isinstance(results, list):
+            row_values = self._get_row_values(results)
+            child_values = None
+            if self.child_sheets:
+                child_values = self._get_row_values(results, self.child_accessors)
+            for chunk in self._chunks(results, batch_size):
+                chunk_values = [row_values(row) for row in chunk]
+                chunk_mapped = self._map_batch_columns(chunk_values)
+                for row, values, mapped in zip(chunk, chunk_values, chunk_mapped):
+                    if rows_per_sheet and row_count - header_rows == rows_per_sheet:
+                        self._next_sheet(overflow, row_count)
+                        row_count = header_rows
+                    self._make_body(self.body, row, row_count, values, mapped)
+                    row_count += 1
+                    if child_values is not None:
+                        self._write_child_rows(child_values(row))
+                if progress is not None:
+                    progress.advance(len(chunk))
+
+        self._finish_sheet(row_count)
+        self._finish_child_sheets()
+
+        if progress is not None:
+            progress.set_phase("saving")
+        if self.workbook_parts:
+            self.workbook_parts.append(self._save_virtual_workbook(self.wb))
+            content = self._save_zip(self.workbook_parts, renderer_context)
+        else:
+            content = self._save_virtual_workbook(self.wb)
+        if progress is not None:
+            progress.finish()
+        return content
+
+    def _load_template(self, drf_view, has_results):
+        """
+        Compute the static parts of the sheets (header, column header, styles and
+        column plan) from the view, or reuse them from the template cache when the
+        view sets `xlsx_cache_template = True`.
+        """
+        if not (has_results and getattr(drf_view, "xlsx_cache_template", False)):
+            self._load_view_config(drf_view, has_results)
+            return
+
+        # Renderers build different templates, i.e. without child sheets for Arrow
+        key = (type(self), type(drf_view), self._template_fingerprint(drf_view))
+        template = template_cache.get(key)
+        if template is None:
+            self._load_view_config(drf_view, has_results)
+            template = {attr: getattr(self, attr) for attr in TEMPLATE_ATTRS}
+            # Unbound copies, so the cache doesn't keep the request of their context
+            template["fields_dict"] = {
+                key: deepcopy(field) for key, field in self.fields_dict.items()
+            }
+            template_cache.set(key, template)
+        else:
+            self.__dict__.update(template)
+
+    def _template_fingerprint(self, drf_view):
+        config = [
+            get_attribute(drf_view, "header", {}),
+            get_attribute(drf_view, "column_header", {}),
+            get_attribute(drf_view, "body", {}),
+            get_attribute(drf_view, "column_data_styles", {}),
+            get_attribute(drf_view, "sheet_view_options", {}),
+            getattr(drf_view, "xlsx_use_labels", False),
+            self._get_ignore_headers(drf_view),
+            getattr(drf_view, "xlsx_boolean_labels", None),
+            getattr(drf_view, "xlsx_custom_cols", {}),
+            getattr(drf_view, "xlsx_custom_mappings", {}),
+            getattr(drf_view, "xlsx_table", None),
+            getattr(drf_view, "xlsx_child_sheets", {}),
+            # Labels are translated when the template is built
+            get_language(),
+        ]
+        get_serializer_class = getattr(drf_view, "get_serializer_class", None)
+        if get_serializer_class is not None:
+            # i.e. a serializer picked from the action or the request
+            serializer_class = get_serializer_class()
+            config.append(
+                f"{serializer_class.__module__}.{serializer_class.__qualname__}"
+            )
+        return json.dumps(config, default=str)
+
+    @staticmethod
+    def _get_ignore_headers(drf_view):
+        # `XLSXFileMixin` adds the columns left out by the request to the ignored ones
+        get_excluded_keys = getattr(drf_view, "get_xlsx_excluded_keys", None)
+        if get_excluded_keys is not None:
+            return get_excluded_keys()
+        return getattr(drf_view, "xlsx_ignore_headers", [])
+
+    def _load_view_config(self, drf_view, has_results):
         # Take header and column_header params from view
-        header = get_attribute(drf_view, "header", {})
-        use_header = header and header.get("use_header", True)
-        self.ws.title = header.get("tab_title", "Report")
-        header_title = header.get("header_title", "Report")
-        img_addr = header.get("img")
-        if img_addr:
-            img = Image(img_addr)
-            self.ws.add_image(img, "A1")
-        header_style = (
-            XLSXStyle(header.get("style")) if header and "style" in header else None
+        self.header = get_attribute(drf_view, "header", {})
+        self.use_header = self.header and self.header.get("use_header", True)
+        self.tab_title = self.header.get("tab_title", "Report")
+        self.header_style = (
+            XLSXStyle(self.header.get("style"))
+            if self.header and "style" in self.header
+            else None
         )
 
-        column_header = get_attribute(drf_view, "column_header", {})
-        column_header_style = (
-            XLSXStyle(column_header.get("style"))
-            if column_header and "style" in column_header
+        self.column_header = get_attribute(drf_view, "column_header", {})
+        self.column_header_style = (
+            XLSXStyle(self.column_header.get("style"))
+            if self.column_header and "style" in self.column_header
             else None
         )
-        column_count = 0
-        row_count = 1
-        if use_header:
-            row_count += 1
+        self.column_titles_display = []
         # Make column headers
-        column_titles = column_header.get("titles", [])
+        column_titles = self.column_header.get("titles", [])
 
         # If we have results, then flatten field names
-        if len(results):
+        if has_results:
             # Set `xlsx_use_labels = True` inside the API View to enable labels.
             use_labels = getattr(drf_view, "xlsx_use_labels", False)
 
             # A list of header keys to ignore in our export
-            self.ignore_headers = getattr(drf_view, "xlsx_ignore_headers", [])
+            self.ignore_headers = self._get_ignore_headers(drf_view)
 
             # Create a mapping dict named `xlsx_boolean_labels` inside the API View.
             # I.e.: xlsx_boolean_labels: {True: "Yes", False: "No"}
@@ -158,6 +386,18 @@ class XLSXRenderer(BaseRenderer):
             xlsx_header_dict = self._flatten_serializer_keys(
                 drf_view.get_serializer(), use_labels=use_labels
             )
+
+            # Write lists of objects as the rows of their own sheet instead of a
+            # column, keyed by a column of the parent row. Example:
+            # xlsx_child_sheets = {"lines": {"title": "Lines", "parent_key": "id"}}
+            self.child_sheets = self._load_child_sheets(
+                drf_view, xlsx_header_dict, use_labels
+            )
+            self.child_accessors = [
+                (key, tuple(key.split(".")))
+                for child_sheet in self.child_sheets
+                for key in (child_sheet["parent_key"], child_sheet["key"])
+            ]
             if self.custom_cols:
                 custom_header_dict = {
                     key: self.custom_cols[key].get("label", None) or key
@@ -169,33 +409,88 @@ class XLSXRenderer(BaseRenderer):
             else:
                 self.combined_header_dict = xlsx_header_dict
 
-            for column_name, column_label in self.combined_header_dict.items():
-                if column_name == "row_color":
-                    continue
-                column_count += 1
+            self.column_accessors = self._compile_accessors()
+            self.column_styles = {
+                key: XLSXStyle(style) for key, style in self.column_data_styles.items()
+            }
+
+            for column_count, (key, _) in enumerate(self.column_accessors, start=1):
+                column_label = self.combined_header_dict[key]
                 if column_count > len(column_titles):
                     column_name_display = column_label
                 else:
                     column_name_display = column_titles[column_count - 1]
+                self.column_titles_display.append(column_name_display)
 
-                header_cell = self.ws.cell(
-                    row=row_count, column=column_count, value=column_name_display
-                )
-                set_cell_style(header_cell, column_header_style)
-            self.ws.row_dimensions[row_count].height = column_header.get("height", 45)
+        body = get_attribute(drf_view, "body", {})
+        self.body = body
+        self.body_style = (
+            XLSXStyle(body.get("style")) if body and "style" in body else None
+        )
 
-        # Set the header row
-        if use_header:
-            last_col_letter = get_column_letter(column_count) if column_count else "G"
-            self.ws.merge_cells(f"A1:{last_col_letter}1")
+        # Write the body as an Excel table, styled by the table style instead of the
+        # header and body styles. Example:
+        # xlsx_table = {"style": "TableStyleMedium9", "name": "Report"}
+        table = getattr(drf_view, "xlsx_table", None)
+        self.table = {} if table is True else table
+        if self.table is not None:
+            self.column_header_style = None
+            self.body_style = None
+            self.column_titles_display = self._table_titles(self.column_titles_display)
+
+        # Set sheet view options
+        # Example:
+        # sheet_view_options = {
+        #   'rightToLeft': True,
+        #   'showGridLines': False
+        # }
+        self.sheet_view_options = get_attribute(drf_view, "sheet_view_options", dict())
+
+    def _get_backend(self) -> "WorkbookBackend":
+        from drf_excel.backends import get_backend
+
+        return get_backend(self.engine, tables=self.table is not None)
+
+    def _new_workbook(self):
+        return self.backend.new_workbook()
+
+    def _new_sheet(self, title=None):
+        return self.backend.new_sheet(self.wb, title)
+
+    def _sheet_title(self):
+        # Given to the new sheet, so backends validate it when creating it. Excel
+        # titles have at most 31 characters, the suffixes are kept
+        suffix = "" if self.sheet_count == 1 else f" ({self.sheet_count})"
+        if self.preview:
+            suffix += " (Preview)"
+        return self.tab_title[: 31 - len(suffix)] + suffix
+
+    def _start_sheet(self, ws):
+        """
+        Write the header, the column header and the column widths of a new sheet.
+        """
+        from openpyxl.utils import get_column_letter
+        from openpyxl.worksheet.views import SheetView
+
+        from drf_excel.images import get_image
+
+        self.ws = ws
+        # Written before the rows by write only sheets
+        self.ws.views.sheetView[0] = SheetView(**self.sheet_view_options)
 
-            cell = self.ws.cell(row=1, column=1, value=header_title)
-            set_cell_style(cell, header_style)
-            self.ws.row_dimensions[1].height = header.get("height", 45)
+        column_count = len(self.column_titles_display)
 
         # Set column width
-        column_width = column_header.get("column_width", 20)
-        if isinstance(column_width, list):
+        column_width = self.column_header.get("column_width", 20)
+        if column_width == "auto":
+            # Widths are tracked while the body is written and applied afterwards
+            self._init_auto_width(self.column_header, self.column_titles_display)
+            if self.backend.columns_before_rows:
+                # Columns can't be resized once rows are streamed, only the titles
+                # and the database lengths are used
+                self._apply_auto_width()
+                self.auto_width = None
+        elif isinstance(column_width, list):
             for i, width in enumerate(column_width):
                 col_letter = get_column_letter(i + 1)
                 self.ws.column_dimensions[col_letter].width = width
@@ -204,36 +499,345 @@ class XLSXRenderer(BaseRenderer):
                 col_letter = get_column_letter(ws_column)
                 self.ws.column_dimensions[col_letter].width = column_width
 
-        # Make body
-        body = get_attribute(drf_view, "body", {})
-        self.body_style = (
-            XLSXStyle(body.get("style")) if body and "style" in body else None
+        self.column_cell_styles = None
+        if self.body.get("sheet_defaults"):
+            self._set_sheet_defaults()
+
+        img_addr = self.header.get("img")
+        if img_addr:
+            self.ws.add_image(get_image(img_addr), "A1")
+
+        # Set the header row
+        if self.use_header:
+            last_col_letter = get_column_letter(column_count) if column_count else "G"
+            self.ws.merge_cells(f"A1:{last_col_letter}1")
+
+            cell = self.ws.cell(
+                row=1, column=1, value=self.header.get("header_title", "Report")
+            )
+            set_cell_style(cell, self.header_style)
+            self.ws.row_dimensions[1].height = self.header.get("height", 45)
+
+        row_count = 2 if self.use_header else 1
+        if column_count:
+            for column, title in enumerate(self.column_titles_display, start=1):
+                header_cell = self.ws.cell(row=row_count, column=column, value=title)
+                set_cell_style(header_cell, self.column_header_style)
+            self.ws.row_dimensions[row_count].height = self.column_header.get(
+                "height", 45
+            )
+
+    def _set_sheet_defaults(self):
+        """
+        Set the body height as the default row height of the sheet, and the body,
+        column and number format styles of each column as the style of the column.
+        Excel only applies them to cells left out of the file, so the style of each
+        column is also copied to its cells instead of being built cell by cell.
+        """
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.utils import get_column_letter
+
+        self.ws.sheet_format.defaultRowHeight = self.body.get("height", 40)
+        self.ws.sheet_format.customHeight = True
+        column_cell_styles = []
+        for column, (key, _) in enumerate(self.column_accessors, start=1):
+            cell = WriteOnlyCell(self.ws)
+            self._drf_to_xlsx_field(key=key, value=None).style_cell(cell)
+            column_dimension = self.ws.column_dimensions[get_column_letter(column)]
+            column_dimension._style = copy(cell._style)
+            column_cell_styles.append(cell._style)
+        if self.shared_column_fields:
+            self.column_cell_styles = column_cell_styles
+
+    def _finish_sheet(self, last_row=None):
+        if self.auto_width:
+            self._apply_auto_width()
+        if self.table is not None and self.column_titles_display:
+            self._add_table(last_row)
+        self.backend.finish_sheet(self.ws)
+
+    def _next_sheet(self, overflow, last_row=None):
+        """
+        Roll over to a new sheet, or to a new workbook packaged in a zip.
+        """
+        self._finish_sheet(last_row)
+        self.sheet_count += 1
+        if overflow == "zip":
+            self._finish_child_sheets()
+            self.workbook_parts.append(self._save_virtual_workbook(self.wb))
+            self.wb = self._new_workbook()
+            self._start_sheet(self._new_sheet(self._sheet_title()))
+            self._start_child_sheets()
+        else:
+            self._start_sheet(self._new_sheet(self._sheet_title()))
+
+    @staticmethod
+    def _table_titles(titles):
+        # Table column names must be unique strings, matching their header cells
+        table_titles = []
+        for title in titles:
+            title = table_title = str(title) or "Column"
+            suffix = 1
+            while table_title in table_titles:
+                suffix += 1
+                table_title = f"{title} ({suffix})"
+            table_titles.append(table_title)
+        return table_titles
+
+    def _add_table(self, last_row):
+        """
+        Wrap the column header and the body of the sheet in an Excel table, with a
+        built-in table style, banded rows and an autofilter.
+        """
+        from openpyxl.utils import get_column_letter
+        from openpyxl.worksheet.filters import AutoFilter
+        from openpyxl.worksheet.table import Table, TableColumn, TableStyleInfo
+
+        header_row = 2 if self.use_header else 1
+        # A table needs at least one row below its header
+        last_row = max(last_row or 0, header_row + 1)
+        ref = (
+            f"A{header_row}:"
+            f"{get_column_letter(len(self.column_titles_display))}{last_row}"
         )
-        if isinstance(results, dict):
-            self._make_body(body, results, row_count)
-        elif isinstance(results, list):
-            for row in results:
-                self._make_body(body, row, row_count)
-                row_count += 1
+        name = self.table.get("name", "Report")
+        table = Table(
+            displayName=name if self.sheet_count == 1 else f"{name}{self.sheet_count}",
+            ref=ref,
+            autoFilter=AutoFilter(ref=ref),
+            tableColumns=[
+                TableColumn(id=column, name=title)
+                for column, title in enumerate(self.column_titles_display, start=1)
+            ],
+            tableStyleInfo=TableStyleInfo(
+                name=self.table.get("style", "TableStyleMedium9"),
+                showRowStripes=self.table.get("row_stripes", True),
+                showColumnStripes=self.table.get("column_stripes", False),
+                showFirstColumn=False,
+                showLastColumn=False,
+            ),
+        )
+        with warnings.catch_warnings():
+            # Write only sheets warn about table columns, which are given here
+            warnings.simplefilter("ignore", UserWarning)
+            self.ws.add_table(table)
 
-        # Set sheet view options
-        # Example:
-        # sheet_view_options = {
-        #   'rightToLeft': True,
-        #   'showGridLines': False
-        # }
-        self.sheet_view_options = get_attribute(drf_view, "sheet_view_options", dict())
-        self.ws.views.sheetView[0] = SheetView(**self.sheet_view_options)
+    def _load_child_sheets(self, drf_view, header_dict, use_labels):
+        """
+        Returns the child sheets of `xlsx_child_sheets`, removing their columns from
+        `header_dict`. Their columns are the fields of a nested serializer, or else
+        the keys of the first object written.
+        """
+        child_sheets = []
+        for key, options in getattr(drf_view, "xlsx_child_sheets", {}).items():
+            if key not in header_dict:
+                # Ignored or unknown
+                continue
+            title = header_dict.pop(key)
+            parent_key = options.get("parent_key", "id")
+            columns = None
+            field = self.fields_dict.get(key)
+            if isinstance(field, ListSerializer):
+                self.fields_dict.update(self._serializer_fields(field.child, key))
+                child_header_dict = self._flatten_serializer_keys(
+                    field.child, parent_key=key, use_labels=use_labels
+                )
+                columns = [
+                    (child_key, self._child_title(key, child_key, label))
+                    for child_key, label in child_header_dict.items()
+                ]
+            child_sheets.append(
+                {
+                    "key": key,
+                    "title": str(options.get("title", title))[:31],
+                    "parent_key": parent_key,
+                    "parent_title": str(
+                        options.get(
+                            "parent_title", header_dict.get(parent_key, parent_key)
+                        )
+                    ),
+                    "columns": columns,
+                }
+            )
+        return child_sheets
 
-        return self._save_virtual_workbook(wb)
+    @staticmethod
+    def _child_title(key, child_key, label):
+        # Keys of the child sheet columns are prefixed by the key of the list
+        if label == child_key:
+            return child_key[len(key) + 1 :]
+        return label
+
+    def _start_child_sheets(self):
+        self.child_sheet_states = []
+        for child_sheet in self.child_sheets:
+            ws = self._new_sheet(child_sheet["title"])
+            state = {"ws": ws, "row": 0, "columns": None, "fields": [], "count": 1}
+            if child_sheet["columns"] is not None:
+                self._start_child_sheet(child_sheet, state, child_sheet["columns"])
+            self.child_sheet_states.append(state)
+
+    def _start_child_sheet(self, child_sheet, state, columns):
+        """
+        Write the column header of a child sheet: the parent key and the columns
+        of the objects of the list.
+        """
+        from openpyxl.utils import get_column_letter
+
+        ws = state["ws"]
+        state["columns"] = columns
+        state["keys"] = [child_sheet["parent_key"]] + [key for key, _ in columns]
+        state["fields"] = [{} for _ in state["keys"]]
+        titles = [child_sheet["parent_title"]] + [title for _, title in columns]
+        column_width = self.column_header.get("column_width", 20)
+        if not isinstance(column_width, (int, float)):
+            column_width = 20
+        for column in range(1, len(titles) + 1):
+            ws.column_dimensions[get_column_letter(column)].width = column_width
+        for column, title in enumerate(titles, start=1):
+            set_cell_style(ws.cell(1, column, title), self.column_header_style)
+        state["row"] = 1
+
+    def _write_child_rows(self, values):
+        """
+        Write the objects of the lists of a row to their child sheets, `values`
+        holding the parent key and the list of each child sheet.
+        """
+        for index, (child_sheet, state) in enumerate(
+            zip(self.child_sheets, self.child_sheet_states)
+        ):
+            parent, items = values[2 * index], values[2 * index + 1]
+            if items is _MISSING or not items:
+                continue
+            for item in items:
+                if not isinstance(item, MutableMapping):
+                    continue
+                flattened_item = self._flatten_values(item, child_sheet["key"])
+                if state["columns"] is None:
+                    columns = [
+                        (key, self._child_title(child_sheet["key"], key, key))
+                        for key in flattened_item
+                    ]
+                    self._start_child_sheet(child_sheet, state, columns)
+                rows_per_sheet = self.child_rows_per_sheet
+                if rows_per_sheet and state["row"] - 1 == rows_per_sheet:
+                    self._next_child_sheet(child_sheet, state)
+                state["row"] += 1
+                row_values = [parent] + [
+                    flattened_item.get(key, _MISSING) for key, _ in state["columns"]
+                ]
+                for column, (key, value) in enumerate(
+                    zip(state["keys"], row_values), start=1
+                ):
+                    if value is _MISSING:
+                        continue
+                    field = self._column_field(column - 1, key, value, state["fields"])
+                    field.write(state["ws"], state["row"], column, value)
+
+    def _next_child_sheet(self, child_sheet, state):
+        """
+        Roll a full child sheet over to a new one, i.e. "Lines (2)".
+        """
+        self.backend.finish_sheet(state["ws"])
+        state["count"] += 1
+        suffix = f" ({state['count']})"
+        state["ws"] = self._new_sheet(child_sheet["title"][: 31 - len(suffix)] + suffix)
+        self._start_child_sheet(child_sheet, state, state["columns"])
+
+    def _finish_child_sheets(self):
+        for state in self.child_sheet_states:
+            self.backend.finish_sheet(state["ws"])
+
+    def _save_zip(self, parts, renderer_context):
+        """
+        Package several workbooks in a zip, and update the response headers.
+        """
+        drf_view = renderer_context.get("view")
+        filename = "export.xlsx"
+        if hasattr(drf_view, "get_filename"):
+            filename = drf_view.get_filename(
+                renderer_context.get("request"),
+                *renderer_context.get("args", ()),
+                **renderer_context.get("kwargs", {}),
+            )
+        stem = filename[:-5] if filename.lower().endswith(".xlsx") else filename
 
-    def _save_virtual_workbook(self, wb):
         with TemporaryFile() as tmp:
-            save_workbook(wb, tmp)
+            with zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED) as archive:
+                for part, content in enumerate(parts, start=1):
+                    name = f"{stem}.xlsx" if part == 1 else f"{stem} ({part}).xlsx"
+                    archive.writestr(name, content)
             tmp.seek(0)
-            virtual_workbook = tmp.read()
+            content = tmp.read()
 
-        return virtual_workbook
+        response = renderer_context.get("response")
+        if response is not None:
+            response["Content-Type"] = "application/zip"
+            if response.has_header("content-disposition"):
+                response["content-disposition"] = (
+                    f"attachment; filename={escape_uri_path(stem + '.zip')}"
+                )
+        return content
+
+    def _get_db_column_lengths(self, drf_view):
+        get_column_lengths = getattr(drf_view, "get_xlsx_column_lengths", None)
+        if not callable(get_column_lengths):
+            return {}
+        return get_column_lengths(self.fields_dict) or {}
+
+    def _init_auto_width(self, column_header, column_titles):
+        """
+        Start tracking the display length of each column, seeded with the column
+        titles and, if the view provides them, with lengths computed by the database.
+        """
+        self.auto_width = {
+            "sample": column_header.get("auto_width_sample"),
+            "min": column_header.get("auto_width_min", 8),
+            "max": column_header.get("auto_width_max", 60),
+            "rows": 0,
+            "lengths": [self._display_length(title) for title in column_titles],
+            "fixed": set(),
+        }
+        db_lengths = self.auto_width_db_lengths or {}
+        for index, (key, _) in enumerate(self.column_accessors):
+            if db_lengths.get(key) is not None:
+                lengths = self.auto_width["lengths"]
+                lengths[index] = max(lengths[index], db_lengths[key])
+                self.auto_width["fixed"].add(index)
+
+    def _track_auto_width(self, cells):
+        auto_width = self.auto_width
+        if auto_width["sample"] is not None and (
+            auto_width["rows"] >= auto_width["sample"]
+        ):
+            return
+        auto_width["rows"] += 1
+        lengths = auto_width["lengths"]
+        for index, cell in enumerate(cells):
+            if index in auto_width["fixed"] or cell is None or cell.value is None:
+                continue
+            length = self._display_length(cell.value)
+            if length > lengths[index]:
+                lengths[index] = length
+
+    def _apply_auto_width(self):
+        from openpyxl.utils import get_column_letter
+
+        auto_width = self.auto_width
+        for index, length in enumerate(auto_width["lengths"]):
+            col_letter = get_column_letter(index + 1)
+            # Leave some room for padding and the autofilter/sort arrows
+            width = min(max(length + 2, auto_width["min"]), auto_width["max"])
+            self.ws.column_dimensions[col_letter].width = width
+
+    @staticmethod
+    def _display_length(value):
+        if value is None:
+            return 0
+        return max(len(line) for line in str(value).splitlines() or [""])
+
+    def _save_virtual_workbook(self, wb):
+        return self.backend.save(wb)
 
     def _check_validation_data(self, data):
         detail_key = "detail"
@@ -314,7 +918,7 @@ class XLSXRenderer(BaseRenderer):
 
         return _header_dict
 
-    def _flatten_data(self, data, parent_key="", key_sep=".") -> dict[str, XLSXField]:
+    def _flatten_values(self, data, parent_key="", key_sep=".") -> dict[str, Any]:
         items = []
         for k, v in data.items():
             new_key = f"{parent_key}{key_sep}{k}" if parent_key else k
@@ -324,55 +928,222 @@ class XLSXRenderer(BaseRenderer):
                 v = v.__class__._proxy____cast(v)
 
             if isinstance(v, MutableMapping):
-                items.extend(self._flatten_data(v, new_key, key_sep=key_sep).items())
+                items.extend(self._flatten_values(v, new_key, key_sep=key_sep).items())
             else:
-                xlsx_field = self._drf_to_xlsx_field(key=new_key, value=v)
-                items.append((new_key, xlsx_field))
+                items.append((new_key, v))
 
         return dict(items)
 
-    def _make_body(self, body, row, row_count):
+    def _flatten_data(self, data, parent_key="", key_sep=".") -> dict[str, "XLSXField"]:
+        return {
+            key: self._drf_to_xlsx_field(key=key, value=value)
+            for key, value in self._flatten_values(data, parent_key, key_sep).items()
+        }
+
+    def _compile_accessors(self, key_sep="."):
+        """
+        Precompute, for each output column, the path of keys to follow into a nested
+        row, so values can be pulled straight into column order.
+        """
+        return [
+            (key, tuple(key.split(key_sep)))
+            for key in self.combined_header_dict
+            if key != "row_color"
+        ]
+
+    def _row_values(self, row, accessors=None) -> list:
+        """
+        Pull the values of a row in column order, following the compiled accessors.
+        Falls back to flattening the row when its shape doesn't match the paths,
+        i.e. when a key itself contains the separator.
+        """
+        values = []
+        flattened_row = None
+        if accessors is None:
+            accessors = self.column_accessors
+        for key, path in accessors:
+            value = row
+            for part in path:
+                if not isinstance(value, MutableMapping):
+                    value = _MISSING
+                    break
+                value = value.get(part, _MISSING)
+                if value is _MISSING:
+                    if flattened_row is None:
+                        flattened_row = self._flatten_values(row)
+                    value = flattened_row.get(key, _MISSING)
+                    break
+            else:
+                # Trap Promise instances for when _lazy is used
+                if isinstance(value, Promise):
+                    value = value.__class__._proxy____cast(value)
+                if isinstance(value, MutableMapping):
+                    value = _MISSING
+            values.append(value)
+        return values
+
+    def _get_row_values(self, results, accessors=None):
+        """
+        Returns the function pulling the column values, or the values of
+        `accessors`, out of the rows of `results`.
+        """
+        # Rows compiled to tuples by `XLSXFileMixin`, see `drf_excel.compiler`
+        compiled_keys = getattr(results, "xlsx_keys", None)
+        self.compiled_row_color = getattr(results, "xlsx_row_color", False)
+        if compiled_keys is not None:
+            return self._compiled_row_values(compiled_keys, accessors)
+        if accessors is not None:
+            return partial(self._row_values, accessors=accessors)
+        return self._row_values
+
+    def _compiled_row_values(self, compiled_keys, accessors=None):
+        """
+        Returns the function pulling the column values out of compiled rows, the
+        tuples are used as is when they are already in column order.
+        """
+        if accessors is None:
+            accessors = self.column_accessors
+        keys = tuple(key for key, _ in accessors)
+        if compiled_keys == keys:
+            return lambda row: row
+        positions = {key: index for index, key in enumerate(compiled_keys)}
+        indexes = [positions.get(key) for key in keys]
+        return lambda row: [
+            _MISSING if index is None else row[index] for index in indexes
+        ]
+
+    def _row_color(self, row):
+        if isinstance(row, tuple):
+            return row[-1] if self.compiled_row_color else _MISSING
+        return row.get("row_color", _MISSING)
+
+    @staticmethod
+    def _chunks(rows, size):
+        if not size:
+            yield rows
+            return
+        for start in range(0, len(rows), size):
+            yield rows[start : start + size]
+
+    def _map_batch_columns(self, chunk_values) -> list[dict]:
+        """
+        Call batch formatters once per column with the values of a chunk of rows.
+        Returns, for each row, the mapped values keyed by column index.
+        """
+        chunk_mapped = [{} for _ in chunk_values]
+        for index, (key, _) in enumerate(self.column_accessors):
+            formatter = self._get_mapping(key)
+            if not is_batch_formatter(formatter):
+                continue
+            positions = [
+                position
+                for position, values in enumerate(chunk_values)
+                if values[index] is not _MISSING
+            ]
+            if not positions:
+                continue
+            mapped_values = formatter([chunk_values[p][index] for p in positions])
+            if len(mapped_values) != len(positions):
+                raise ValueError(
+                    f"Batch formatter for '{key}' returned {len(mapped_values)} "
+                    f"values for {len(positions)} rows."
+                )
+            for position, mapped_value in zip(positions, mapped_values):
+                chunk_mapped[position][index] = mapped_value
+        return chunk_mapped
+
+    def _make_body(self, body, row, row_count, values=None, mapped=None):
         column_count = 0
         row_count += 1
-        flattened_row = self._flatten_data(row)
+        if values is None:
+            values = self._row_values(row)
+        row_color = self._row_color(row)
+        sheet_defaults = body.get("sheet_defaults", False)
+        column_cell_styles = self.column_cell_styles
 
-        for header_key in self.combined_header_dict:
-            if header_key == "row_color":
-                continue
+        cells = []
+        for index, ((header_key, _), value) in enumerate(
+            zip(self.column_accessors, values)
+        ):
             column_count += 1
-            field = flattened_row.get(header_key)
-            field.cell(self.ws, row_count, column_count) if field else self.ws.cell(
-                row_count, column_count
-            )
+            if value is _MISSING:
+                if sheet_defaults and row_color is _MISSING:
+                    # Left out, displayed with the style of its column
+                    cells.append(None)
+                    continue
+                cell = self.ws.cell(row_count, column_count)
+            else:
+                mapping = None
+                if mapped and index in mapped:
+                    mapping = partial(_mapped_value, mapped[index])
+                style = None
+                if column_cell_styles is not None:
+                    style = column_cell_styles[index]
+                field = self._column_field(index, header_key, value)
+                cell = field.write(
+                    self.ws, row_count, column_count, value, mapping, style
+                )
+            cells.append(cell)
 
-        self.ws.row_dimensions[row_count].height = body.get("height", 40)
+        if self.auto_width:
+            self._track_auto_width(cells)
 
-        if "row_color" in row:
-            last_letter = get_column_letter(column_count)
-            cell_range = self.ws[f"A{row_count}" : f"{last_letter}{row_count}"]
-            fill = PatternFill(fill_type="solid", start_color=row["row_color"])
+        if not sheet_defaults:
+            self.ws.row_dimensions[row_count].height = body.get("height", 40)
 
-            for r in cell_range:
-                for c in r:
-                    c.fill = fill
+        if row_color is not _MISSING:
+            from openpyxl.styles import PatternFill
 
-    def _drf_to_xlsx_field(self, key, value) -> XLSXField:
-        field = self.fields_dict.get(key)
+            fill = PatternFill(fill_type="solid", start_color=row_color)
+            for cell in cells:
+                cell.fill = fill
 
-        cell_style = (
-            XLSXStyle(self.column_data_styles.get(key))
-            if key in self.column_data_styles
-            else None
+    def _init_column_fields(self):
+        self.column_fields = [{} for _ in self.column_accessors]
+
+    def _column_field(self, index, key, value, column_fields=None) -> "XLSXField":
+        """
+        Returns the field writing the cells of the column at `index`, built for its
+        first cell and reused for the following ones instead of a field per cell.
+        Columns without a typed serializer field get a second one for list values.
+        Renderers whose `_drf_to_xlsx_field` depends on more than the type of the
+        value can set `shared_column_fields = False` to get a field per cell.
+        """
+        if not self.shared_column_fields:
+            return self._drf_to_xlsx_field(key=key, value=value)
+        is_list = isinstance(value, Iterable) and not isinstance(value, str)
+        if column_fields is None:
+            column_fields = self.column_fields
+        fields = column_fields[index]
+        field = fields.get(is_list)
+        if field is None:
+            field = fields[is_list] = self._drf_to_xlsx_field(key=key, value=value)
+        return field
+
+    def _get_mapping(self, key):
+        # Basically using formatter of custom col as a custom mapping
+        formatter = self.custom_cols.get(key, {}).get("formatter")
+        return formatter or self.custom_mappings.get(key)
+
+    def _drf_to_xlsx_field(self, key, value, mapping=None) -> "XLSXField":
+        from drf_excel.fields import (
+            XLSXBooleanField,
+            XLSXDateField,
+            XLSXField,
+            XLSXListField,
+            XLSXNumberField,
         )
 
+        field = self.fields_dict.get(key)
+
+        cell_style = self.column_styles.get(key)
+
         kwargs = {
             "key": key,
             "value": value,
             "field": field,
             "style": self.body_style,
-            # Basically using formatter of custom col as a custom mapping
-            "mapping": self.custom_cols.get(key, {}).get("formatter")
-            or self.custom_mappings.get(key),
+            "mapping": mapping or self._get_mapping(key),
             "cell_style": cell_style,
         }
 
@@ -0,0 +1,414 @@
+from collections import defaultdict
+from io import BytesIO
+
+from openpyxl import Workbook
+from openpyxl.cell import Cell, WriteOnlyCell
+from openpyxl.styles.colors import COLOR_INDEX
+from openpyxl.utils import column_index_from_string, coordinate_to_tuple
+from openpyxl.utils.datetime import to_excel
+from openpyxl.workbook.child import INVALID_TITLE_REGEX
+from openpyxl.worksheet.cell_range import CellRange
+from openpyxl.worksheet.dimensions import SheetFormatProperties
+from openpyxl.worksheet.views import SheetViewList
+
+# Padding of Excel, in characters, added by XlsxWriter to the column widths
+XLSXWRITER_PADDING = 5 / 7
+
+
+class WriteOnlySheet:
+    """
+    Wrapper giving an openpyxl write only worksheet the part of the worksheet API
+    used by `XLSXRenderer`. Cells are buffered until their row is complete and then
+    streamed to the file, so rows must be written in order, and the column widths
+    and sheet view set before the first row.
+    """
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.row_number = 0
+        self.written_rows = 0
+        self.cells = []
+
+    def __getattr__(self, name):
+        # title, row_dimensions, column_dimensions, views, add_image...
+        return getattr(self.ws, name)
+
+    @property
+    def title(self):
+        return self.ws.title
+
+    @title.setter
+    def title(self, value):
+        self.ws.title = value
+
+    def cell(self, row, column, value=None):
+        if row != self.row_number:
+            if row < self.row_number:
+                raise ValueError(
+                    f"Row {row} written after row {self.row_number} in a write only "
+                    "sheet."
+                )
+            self.flush()
+            # Blank rows in between
+            for _ in range(self.written_rows + 1, row):
+                self.ws.append([])
+            self.written_rows = row - 1
+            self.row_number = row
+        cell = WriteOnlyCell(self.ws, value)
+        self.cells.extend([None] * (column - 1 - len(self.cells)))
+        self.cells.append(cell)
+        return cell
+
+    def merge_cells(self, range_string):
+        self.ws.merged_cells.add(CellRange(range_string))
+
+    def flush(self):
+        if self.row_number > self.written_rows:
+            self.ws.append(self.cells)
+            self.written_rows = self.row_number
+            self.cells = []
+
+
+# XlsxWriter indexes of the openpyxl border styles and fill patterns
+BORDER_STYLES = (
+    None,
+    "thin",
+    "medium",
+    "dashed",
+    "dotted",
+    "thick",
+    "double",
+    "hair",
+    "mediumDashed",
+    "dashDot",
+    "mediumDashDot",
+    "dashDotDot",
+    "mediumDashDotDot",
+    "slantDashDot",
+)
+FILL_PATTERNS = (
+    None,
+    "solid",
+    "mediumGray",
+    "darkGray",
+    "lightGray",
+    "darkHorizontal",
+    "darkVertical",
+    "darkDown",
+    "darkUp",
+    "darkGrid",
+    "darkTrellis",
+    "lightHorizontal",
+    "lightVertical",
+    "lightDown",
+    "lightUp",
+    "lightGrid",
+    "lightTrellis",
+    "gray125",
+    "gray0625",
+)
+HORIZONTAL_ALIGNMENTS = {"centerContinuous": "center_across", "general": None}
+VERTICAL_ALIGNMENTS = {
+    "center": "vcenter",
+    "justify": "vjustify",
+    "distributed": "vdistributed",
+}
+UNDERLINES = {"single": 1, "double": 2, "singleAccounting": 33, "doubleAccounting": 34}
+
+
+def _color(color):
+    """
+    Returns the `#RRGGBB` color of an openpyxl color, `None` for theme colors.
+    """
+    if color is None:
+        return None
+    if color.type == "rgb" and isinstance(color.rgb, str):
+        return f"#{color.rgb[-6:]}"
+    if color.type == "indexed" and color.indexed < len(COLOR_INDEX):
+        return f"#{COLOR_INDEX[color.indexed][-6:]}"
+    return None
+
+
+def _rotation(rotation):
+    # openpyxl writes 91 to 180 for -1 to -90 degrees, and 255 for stacked text
+    if rotation == 255:
+        return 270
+    return rotation if rotation <= 90 else 90 - rotation
+
+
+def format_options(cell):
+    """
+    Returns the XlsxWriter format properties of the style of an openpyxl cell.
+    """
+    options = {}
+    font = cell.font
+    options.update(
+        font_name=font.name,
+        font_size=font.sz,
+        bold=font.b,
+        italic=font.i,
+        underline=UNDERLINES.get(font.u),
+        font_strikeout=font.strike,
+        font_color=_color(font.color),
+        font_script={"superscript": 1, "subscript": 2}.get(font.vertAlign),
+    )
+    fill = cell.fill
+    pattern = getattr(fill, "fill_type", None)
+    if pattern and pattern in FILL_PATTERNS:
+        options["pattern"] = FILL_PATTERNS.index(pattern)
+        if pattern == "solid":
+            # The color of solid fills is their background in XlsxWriter
+            options["bg_color"] = _color(fill.fgColor)
+        else:
+            options["fg_color"] = _color(fill.fgColor)
+            options["bg_color"] = _color(fill.bgColor)
+    border = cell.border
+    for side_name in ("left", "right", "top", "bottom"):
+        side = getattr(border, side_name)
+        if side is not None and side.style in BORDER_STYLES:
+            options[side_name] = BORDER_STYLES.index(side.style)
+            options[f"{side_name}_color"] = _color(side.color)
+    alignment = cell.alignment
+    options.update(
+        align=HORIZONTAL_ALIGNMENTS.get(alignment.horizontal, alignment.horizontal),
+        valign=VERTICAL_ALIGNMENTS.get(alignment.vertical, alignment.vertical),
+        text_wrap=alignment.wrap_text,
+        shrink=alignment.shrink_to_fit,
+        indent=alignment.indent or None,
+        rotation=_rotation(alignment.text_rotation) or None,
+    )
+    if cell.number_format != "General":
+        options["num_format"] = cell.number_format
+    return {name: value for name, value in options.items() if value}
+
+
+def check_title(title):
+    """
+    Raise a `ValueError` for a sheet title openpyxl refuses, or too long for Excel.
+    """
+    match = INVALID_TITLE_REGEX.search(title)
+    if match:
+        raise ValueError(f"Invalid character {match.group(0)} found in sheet title")
+    if not title or len(title) > 31:
+        raise ValueError("Sheet titles must have between 1 and 31 characters")
+
+
+class XlsxWriterBook:
+    """
+    XlsxWriter workbook, with an openpyxl workbook registering the styles of the
+    cells of its sheets. Each style is converted to an XlsxWriter format once.
+    """
+
+    def __init__(self, workbook, output):
+        self.workbook = workbook
+        self.output = output
+        self.styles = Workbook(write_only=True)
+        self.formats = {}
+        self.worksheets = []
+
+    def create_sheet(self, title=None):
+        if title is not None:
+            check_title(title)
+        ws = XlsxWriterSheet(self, self.workbook.add_worksheet(title))
+        self.worksheets.append(ws)
+        return ws
+
+    def cell_format(self, cell):
+        # Cells with the default style don't need a format
+        if not cell.has_style:
+            return None
+        key = tuple(cell._style)
+        if key not in self.formats:
+            self.formats[key] = self.workbook.add_format(format_options(cell))
+        return self.formats[key]
+
+
+class _Dimension:
+    def __init__(self):
+        self.width = None
+        self.height = None
+        self._style = None
+
+
+class XlsxWriterSheet:
+    """
+    Wrapper giving an XlsxWriter worksheet the part of the openpyxl worksheet API
+    used by `XLSXRenderer`. Cells are openpyxl cells, buffered until their row is
+    complete and then written with the format of their style, so rows must be
+    written in order. Column widths, images and the sheet view are applied by
+    `finish`.
+    """
+
+    encoding = "utf-8"
+
+    def __init__(self, book, worksheet):
+        self.book = book
+        self.worksheet = worksheet
+        # Cells register their styles in the workbook of their sheet
+        self.parent = book.styles
+        self.row_number = 0
+        self.written_rows = 0
+        self.cells = {}
+        self.merges = {}
+        self.images = []
+        self.started = False
+        self.row_dimensions = defaultdict(_Dimension)
+        self.column_dimensions = defaultdict(_Dimension)
+        self.sheet_format = SheetFormatProperties()
+        self.views = SheetViewList()
+
+    @property
+    def title(self):
+        return self.worksheet.name
+
+    @title.setter
+    def title(self, value):
+        check_title(value)
+        self.worksheet.name = value
+
+    def cell(self, row, column, value=None):
+        if row != self.row_number:
+            if row < self.row_number:
+                raise ValueError(
+                    f"Row {row} written after row {self.row_number} in an XlsxWriter "
+                    "sheet."
+                )
+            self.flush()
+            self.row_number = row
+        cell = self.cells[column] = WriteOnlyCell(self, value)
+        return cell
+
+    def merge_cells(self, range_string):
+        cell_range = CellRange(range_string)
+        self.merges.setdefault(cell_range.min_row, []).append(cell_range)
+
+    def add_image(self, img, anchor="A1"):
+        self.images.append((img, anchor))
+
+    def add_table(self, table):
+        cell_range = CellRange(table.ref)
+        style_info = table.tableStyleInfo
+        self.worksheet.add_table(
+            cell_range.min_row - 1,
+            cell_range.min_col - 1,
+            cell_range.max_row - 1,
+            cell_range.max_col - 1,
+            {
+                "name": table.displayName,
+                "style": style_info.name,
+                "banded_rows": bool(style_info.showRowStripes),
+                "banded_columns": bool(style_info.showColumnStripes),
+                "first_column": bool(style_info.showFirstColumn),
+                "last_column": bool(style_info.showLastColumn),
+                "autofilter": table.autoFilter is not None,
+                "columns": [{"header": column.name} for column in table.tableColumns],
+            },
+        )
+
+    def _start(self):
+        # The default row height is written with the first row
+        if self.started:
+            return
+        self.started = True
+        if self.sheet_format.customHeight:
+            self.worksheet.set_default_row(self.sheet_format.defaultRowHeight)
+
+    def _write_cell(self, row, column, cell):
+        value = cell.value
+        cell_format = self.book.cell_format(cell)
+        if value is None:
+            self.worksheet.write_blank(row, column, None, cell_format)
+        elif cell.data_type == "f":
+            self.worksheet.write_formula(row, column, value, cell_format)
+        elif cell.data_type == "s":
+            self.worksheet.write_string(row, column, value, cell_format)
+        elif cell.data_type == "b":
+            self.worksheet.write_boolean(row, column, value, cell_format)
+        elif cell.data_type == "d":
+            # Serial numbers of openpyxl, which unlike XlsxWriter's keep dates before
+            # March 1900 on their day
+            self.worksheet.write_number(row, column, to_excel(value), cell_format)
+        else:
+            self.worksheet.write_number(row, column, value, cell_format)
+
+    def _merge(self, cell_range, cell=None):
+        if cell_range.size == {"rows": 1, "columns": 1}:
+            return
+        self.worksheet.merge_range(
+            cell_range.min_row - 1,
+            cell_range.min_col - 1,
+            cell_range.max_row - 1,
+            cell_range.max_col - 1,
+            None,
+            self.book.cell_format(cell) if cell is not None else None,
+        )
+
+    def flush(self):
+        if self.row_number <= self.written_rows:
+            return
+        self._start()
+        row = self.row_number - 1
+        dimension = self.row_dimensions.pop(self.row_number, None)
+        if dimension is not None and dimension.height is not None:
+            self.worksheet.set_row(row, dimension.height)
+        for cell_range in self.merges.pop(self.row_number, []):
+            self._merge(cell_range, self.cells.get(cell_range.min_col))
+        for column in sorted(self.cells):
+            self._write_cell(row, column - 1, self.cells[column])
+        self.written_rows = self.row_number
+        self.cells = {}
+
+    def finish(self):
+        """
+        Write the last row, and the column widths and styles, the images and the
+        sheet view.
+        """
+        self.flush()
+        self._start()
+        for cell_ranges in self.merges.values():
+            for cell_range in cell_ranges:
+                self._merge(cell_range)
+        self.merges = {}
+        for row, dimension in self.row_dimensions.items():
+            if dimension.height is not None:
+                self.worksheet.set_row(row - 1, dimension.height)
+        for col_letter, dimension in self.column_dimensions.items():
+            self._set_column(column_index_from_string(col_letter) - 1, dimension)
+        for img, anchor in self.images:
+            row, column = coordinate_to_tuple(anchor)
+            self.worksheet.insert_image(
+                row - 1,
+                column - 1,
+                f"image.{img.format}",
+                {"image_data": BytesIO(img._data())},
+            )
+        self._set_sheet_view(self.views.sheetView[0])
+
+    def _set_column(self, column, dimension):
+        width = dimension.width
+        if width is not None and width >= 1 + XLSXWRITER_PADDING:
+            # XlsxWriter adds the padding of Excel to the width, openpyxl doesn't
+            width -= XLSXWRITER_PADDING
+        cell_format = None
+        if dimension._style is not None:
+            cell_format = self.book.cell_format(
+                Cell(self, style_array=dimension._style)
+            )
+        if width is not None or cell_format is not None:
+            self.worksheet.set_column(column, column, width, cell_format)
+
+    def _set_sheet_view(self, view):
+        if view.rightToLeft:
+            self.worksheet.right_to_left()
+        if view.showGridLines is False:
+            self.worksheet.hide_gridlines(2)
+        if view.showZeros is False:
+            self.worksheet.hide_zero()
+        if view.showRowColHeaders is False:
+            self.worksheet.hide_row_col_headers()
+        if view.zoomScale:
+            self.worksheet.set_zoom(view.zoomScale)
+        if view.view == "pageLayout":
+            self.worksheet.set_page_view(1)
+        elif view.view == "pageBreakPreview":
+            self.worksheet.set_page_view(2)
@@ -0,0 +1,70 @@
+import hashlib
+import json
+import uuid
+
+from django.core.cache import caches
+
+
+class SharedExport(Exception):
+    """
+    Raised by a request joining an identical export, with the response of that
+    export to send instead of rendering it again.
+    """
+
+    def __init__(self, response):
+        super().__init__()
+        self.response = response
+
+
+def export_fingerprint(*parts):
+    """
+    Returns a stable key for the JSON serializable `parts` of an export.
+    """
+    data = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+class CacheSingleFlight:
+    """
+    Lets a single one of the identical exports requested at the same time run, across
+    processes, with a lock in a Django cache. The request holding the lock publishes
+    its result in the cache for `result_timeout` seconds, and the others read it
+    from there. The lock expires after `timeout` seconds, so a crashed worker
+    doesn't hold it forever.
+    """
+
+    def __init__(self, key, alias="default", timeout=60, result_timeout=10):
+        self.lock_key = f"drf_excel:single_flight:{key}:lock"
+        self.result_key = f"drf_excel:single_flight:{key}:result"
+        self.alias = alias
+        self.timeout = timeout
+        self.result_timeout = result_timeout
+        self.token = uuid.uuid4().hex
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def acquire(self):
+        return self.cache.add(self.lock_key, self.token, self.timeout)
+
+    def release(self):
+        # Unless it expired and was taken by another request in between
+        if self.cache.get(self.lock_key) == self.token:
+            self.cache.delete(self.lock_key)
+
+    def get(self):
+        """
+        Returns the published result, `{"content": None}` when the export can't be
+        shared, or `None` while it runs.
+        """
+        return self.cache.get(self.result_key)
+
+    def publish(self, content=None, headers=()):
+        """
+        Publish the content and headers of the response, or without `content` let the
+        waiting requests run the export on their own, then release the lock.
+        """
+        result = {"content": content, "headers": list(headers)}
+        self.cache.set(self.result_key, result, self.result_timeout)
+        self.release()
@@ -1,9 +1,19 @@
+import re
+from typing import TYPE_CHECKING
+
 from django.conf import settings as django_settings
-from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE, Cell
-from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+if TYPE_CHECKING:
+    from openpyxl.cell.cell import Cell
 
 ESCAPE_CHARS = ("=", "-", "+", "@", "\t", "\r", "\n")
 
+# Same as `openpyxl.cell.cell.ILLEGAL_CHARACTERS_RE`, openpyxl isn't imported until
+# the first render
+ILLEGAL_CHARACTERS_RE = re.compile(r"[\000-\010]|[\013-\014]|[\016-\037]")
+
 
 class XLSXStyle:
     # Class that holds all parts of a style, but without being an actual NamedStyle
@@ -31,6 +41,8 @@ class XLSXStyle:
             }
         :return: XLSXStyle object
         """
+        from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+
         if style_dict is None:
             style_dict = {}
         self.font = Font(**style_dict.get("font")) if "font" in style_dict else None
@@ -71,8 +83,60 @@ def get_attribute(get_from, prop_name, default=None):
     return prop
 
 
+def batch_formatter(func):
+    """
+    Mark a formatter of `xlsx_custom_cols` or a callable of `xlsx_custom_mappings` as
+    a batch formatter: it receives a list with the values of a chunk of the column
+    and must return a list of formatted values, in the same order.
+    """
+    func.xlsx_batch = True
+    return func
+
+
+def is_batch_formatter(func):
+    return callable(func) and getattr(func, "xlsx_batch", False) is True
+
+
+class DRFExcelSettings:
+    """
+    Snapshot of the `DRF_EXCEL_*` settings, without their prefix. It's read from the
+    Django settings on first access and reloaded when one of them changes, so the
+    lookups of cells don't go through `django.conf.settings`.
+    """
+
+    prefix = "DRF_EXCEL_"
+
+    def __init__(self):
+        self._values = None
+
+    @property
+    def values(self):
+        if self._values is None:
+            self._values = {
+                name[len(self.prefix) :]: getattr(django_settings, name)
+                for name in dir(django_settings)
+                if name.startswith(self.prefix)
+            }
+        return self._values
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+    def reload(self):
+        self._values = None
+
+
+drf_excel_settings = DRFExcelSettings()
+
+
+@receiver(setting_changed)
+def reload_drf_excel_settings(*, setting, **kwargs):
+    if setting.startswith(DRFExcelSettings.prefix):
+        drf_excel_settings.reload()
+
+
 def get_setting(key, default=None):
-    return getattr(django_settings, f"DRF_EXCEL_{key}", default)
+    return drf_excel_settings.get(key, default)
 
 
 def sanitize_value(value):
@@ -86,7 +150,7 @@ def sanitize_value(value):
     return value
 
 
-def set_cell_style(cell: Cell, style: XLSXStyle):
+def set_cell_style(cell: "Cell", style: XLSXStyle):
     # We are not applying the whole style directly, otherwise we cannot override any part of it
     if style:
         # Only set properties that are provided
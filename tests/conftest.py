@@ -24,3 +24,12 @@ def workbook_reader() -> Callable[[Union[bytes, str]], Workbook]:
         return load_workbook(io_buffer, read_only=True)
 
     return reader_func
+
+
+@pytest.fixture(params=["openpyxl", "write_only", "xlsxwriter"])
+def xlsx_engine(request, settings) -> str:
+    """
+    Run a test with each engine, as the default `DRF_EXCEL_ENGINE`.
+    """
+    settings.DRF_EXCEL_ENGINE = request.param
+    return request.param
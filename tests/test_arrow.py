@@ -0,0 +1,179 @@
+import datetime as dt
+import io
+from decimal import Decimal
+
+import pytest
+from openpyxl import load_workbook
+from rest_framework import serializers
+from rest_framework.generics import GenericAPIView
+from rest_framework.test import APIClient
+from time_machine import TimeMachineFixture
+
+from drf_excel.arrow import ArrowRenderer, ParquetRenderer
+from drf_excel.renderers import XLSXRenderer, template_cache
+from tests.testapp.models import AllFieldsModel, Tag
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+class TypesSerializer(serializers.Serializer):
+    name = serializers.CharField()
+    count = serializers.IntegerField()
+    ratio = serializers.FloatField()
+    price = serializers.DecimalField(max_digits=6, decimal_places=2)
+    created = serializers.DateTimeField()
+    day = serializers.DateField()
+    time = serializers.TimeField()
+    active = serializers.BooleanField()
+    tags = serializers.ListField()
+    extra = serializers.CharField()
+
+
+def _make_view(**attrs):
+    view_class = type("TypesView", (GenericAPIView,), attrs)
+    view_class.serializer_class = TypesSerializer
+    return view_class(request=None, format_kwarg=None)
+
+
+def _row(i):
+    return {
+        "name": f"row {i}",
+        "count": i,
+        "ratio": i / 2,
+        "price": f"{i}.50",
+        "created": "2023-09-10T15:44:37Z",
+        "day": "2023-09-10",
+        "time": "15:44:37",
+        "active": i % 2 == 0,
+        "tags": ["a", "b"],
+        "extra": None,
+    }
+
+
+def _read(content):
+    return pa.ipc.open_stream(io.BytesIO(content)).read_all()
+
+
+def test_arrow_types():
+    content = ArrowRenderer().render(
+        [_row(1), _row(2)], renderer_context={"view": _make_view()}
+    )
+    table = _read(content)
+    assert table.schema.types == [
+        pa.string(),
+        pa.int64(),
+        pa.float64(),
+        pa.decimal128(6, 2),
+        pa.timestamp("us"),
+        pa.date32(),
+        pa.time64("us"),
+        pa.bool_(),
+        pa.string(),
+        pa.string(),
+    ]
+    assert table.to_pylist()[0] == {
+        "name": "row 1",
+        "count": 1,
+        "ratio": 0.5,
+        "price": Decimal("1.50"),
+        "created": dt.datetime(2023, 9, 10, 15, 44, 37),
+        "day": dt.date(2023, 9, 10),
+        "time": dt.time(15, 44, 37),
+        "active": False,
+        "tags": "a, b",
+        "extra": None,
+    }
+
+
+def test_arrow_batches():
+    view = _make_view(xlsx_batch_size=2)
+    content = ArrowRenderer().render(
+        [_row(i) for i in range(5)], renderer_context={"view": view}
+    )
+    reader = pa.ipc.open_stream(io.BytesIO(content))
+    batches = list(reader)
+    assert [batch.num_rows for batch in batches] == [2, 2, 1]
+
+
+def test_arrow_view_options():
+    view = _make_view(
+        xlsx_ignore_headers=["ratio", "price", "created", "day", "time", "tags"],
+        xlsx_boolean_labels={True: "Yes", False: "No"},
+        xlsx_custom_mappings={"extra": lambda value: 42},
+        column_header={"titles": ["Name"]},
+    )
+    table = _read(ArrowRenderer().render([_row(2)], renderer_context={"view": view}))
+    assert table.column_names == ["Name", "count", "active", "extra"]
+    assert table.schema.field("active").type == pa.string()
+    # Mapped columns are inferred
+    assert table.schema.field("extra").type == pa.int64()
+    assert table.to_pylist() == [
+        {"Name": "row 2", "count": 2, "active": "Yes", "extra": 42}
+    ]
+
+
+def test_arrow_child_sheets_cached_template():
+    template_cache.clear()
+    view = _make_view(
+        xlsx_cache_template=True,
+        xlsx_child_sheets={"tags": {"parent_key": "name"}},
+        xlsx_ignore_headers=["ratio", "price", "created", "day", "time", "extra"],
+    )
+    try:
+        xlsx = XLSXRenderer().render([_row(1)], renderer_context={"view": view})
+        table = _read(
+            ArrowRenderer().render([_row(1)], renderer_context={"view": view})
+        )
+    finally:
+        template_cache.clear()
+    assert load_workbook(io.BytesIO(xlsx)).sheetnames == ["Report", "tags"]
+    # Lists stay in their column of the single table
+    assert table.column_names == ["name", "count", "active", "tags"]
+
+
+def test_arrow_invalid_values():
+    row = _row(1)
+    row["count"] = "many"
+    table = _read(
+        ArrowRenderer().render([row], renderer_context={"view": _make_view()})
+    )
+    assert table.column("count").to_pylist() == [None]
+
+
+def test_arrow_empty():
+    table = _read(ArrowRenderer().render([], renderer_context={"view": _make_view()}))
+    assert table.num_rows == 0
+
+
+def test_parquet():
+    content = ParquetRenderer().render(
+        [_row(i) for i in range(3)],
+        renderer_context={"view": _make_view(xlsx_batch_size=2)},
+    )
+    parquet_file = pq.ParquetFile(io.BytesIO(content))
+    assert parquet_file.metadata.num_row_groups == 2
+    assert parquet_file.read().column("count").to_pylist() == [0, 1, 2]
+
+
+@pytest.mark.django_db
+def test_parquet_viewset(time_machine: TimeMachineFixture):
+    time_machine.move_to(dt.datetime(2023, 9, 10, 15, 44, 37), tick=False)
+    instance = AllFieldsModel.objects.create(title="Hello", age=36)
+    instance.tags.set([Tag.objects.create(name="test")])
+
+    response = APIClient().get("/all-fields/?format=parquet")
+    assert response.status_code == 200
+    assert response["content-disposition"] == "attachment; filename=al_fileds.parquet"
+    table = pq.read_table(io.BytesIO(response.content))
+    assert table.to_pylist() == [
+        {
+            "title": "Hello",
+            "created_at": dt.datetime(2023, 9, 10, 15, 44, 37),
+            "updated_date": dt.date(2023, 9, 10),
+            "updated_time": dt.time(15, 44, 37),
+            "age": 36,
+            "is_active": True,
+            "tags": "test",
+        }
+    ]
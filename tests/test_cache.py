@@ -0,0 +1,28 @@
+from drf_excel.cache import LRUCache
+
+
+class TestLRUCache:
+    def test_get_set(self):
+        cache = LRUCache()
+        assert cache.get("a") is None
+        assert cache.get("a", 1) == 1
+        cache.set("a", 2)
+        assert cache.get("a") == 2
+        assert "a" in cache
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert len(cache) == 2
+        assert "b" not in cache
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+
+    def test_clear(self):
+        cache = LRUCache()
+        cache.set("a", 1)
+        cache.clear()
+        assert len(cache) == 0
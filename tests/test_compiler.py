@@ -0,0 +1,91 @@
+import pytest
+from rest_framework import serializers
+
+from drf_excel.compiler import (
+    CompileError,
+    XLSXRows,
+    XLSXRowSerializer,
+    compile_serializer,
+)
+from drf_excel.renderers import _MISSING
+from tests.testapp.models import Author, Book, Tag
+from tests.testapp.serializers import AuthorSerializer, BookSerializer
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def book():
+    book = Book.objects.create(title="Dune", author=Author.objects.create(name="FH"))
+    book.tags.add(Tag.objects.create(name="sf"))
+    return book
+
+
+def test_compile_serializer(book):
+    row = compile_serializer(BookSerializer(), ["title", "author.name", "tags"])
+    assert row(book) == ("Dune", "FH", ["sf"])
+
+
+def test_compile_serializer_key_order(book):
+    row = compile_serializer(BookSerializer(), ["tags", "author.name", "title"])
+    assert row(book) == (["sf"], "FH", "Dune")
+
+
+def test_compile_serializer_none_nested():
+    class OptionalAuthorSerializer(serializers.Serializer):
+        title = serializers.CharField()
+        author = AuthorSerializer(allow_null=True)
+
+    row = compile_serializer(OptionalAuthorSerializer(), ["title", "author.name"])
+    assert row(Book(title="Anonymous")) == ("Anonymous", _MISSING)
+
+
+def test_compile_serializer_dict_value(book):
+    # Dicts aren't flattened into columns, like with the serializer output
+    row = compile_serializer(BookSerializer(), ["title", "author"])
+    assert row(book) == ("Dune", _MISSING)
+
+
+def test_compile_serializer_row_color(book):
+    class ColorSerializer(BookSerializer):
+        row_color = serializers.SerializerMethodField()
+
+        class Meta(BookSerializer.Meta):
+            fields = ("title", "row_color")
+
+        def get_row_color(self, instance):
+            return "FFFFFFCC"
+
+    row = compile_serializer(ColorSerializer(), ["title"], row_color=True)
+    assert row(book) == ("Dune", "FFFFFFCC")
+
+
+@pytest.mark.parametrize(
+    "keys",
+    [
+        ["title", "nope"],
+        ["title.length"],
+        ["author.name", "title", "author.nope"],
+    ],
+)
+def test_compile_serializer_errors(keys):
+    with pytest.raises(CompileError):
+        compile_serializer(BookSerializer(), keys)
+
+
+def test_compile_serializer_custom_representation():
+    class CustomSerializer(BookSerializer):
+        def to_representation(self, instance):
+            return {"title": instance.title.upper()}
+
+    with pytest.raises(CompileError):
+        compile_serializer(CustomSerializer(), ["title"])
+
+
+def test_row_serializer(book):
+    row = compile_serializer(BookSerializer(), ["title"])
+    data = XLSXRowSerializer(Book.objects, row, ["title"]).data
+    assert isinstance(data, XLSXRows)
+    assert data == [("Dune",)]
+    assert data.xlsx_keys == ("title",)
+    assert data.xlsx_row_color is False
@@ -59,6 +59,54 @@ class TestXLSXField:
         assert isinstance(cell, Cell)
         assert cell.value == "bar"
 
+    def test_write_reused(self, style: XLSXStyle, worksheet: Worksheet):
+        f = XLSXField(
+            key="foo",
+            value=None,
+            field=CharField(),
+            style=style,
+            mapping=None,
+            cell_style=style,
+        )
+        assert f.write(worksheet, 1, 1, "bar").value == "bar"
+        assert f.write(worksheet, 2, 1, "=baz").value == "'=baz"
+        assert f.original_value == "=baz"
+
+    def test_write_with_mapping(self, style: XLSXStyle, worksheet: Worksheet):
+        f = XLSXField(
+            key="foo",
+            value=None,
+            field=CharField(),
+            style=style,
+            mapping=lambda v: v.upper(),
+            cell_style=style,
+        )
+        assert f.write(worksheet, 1, 1, "bar", mapping=lambda v: "mapped").value == (
+            "mapped"
+        )
+        assert f.write(worksheet, 2, 1, "bar").value == "BAR"
+
+    def test_write_custom_cell(self, style: XLSXStyle, worksheet: Worksheet):
+        class UpperField(XLSXField):
+            def cell(self, ws, row, column):
+                cell = super().cell(ws, row, column)
+                cell.value = cell.value.upper()
+                return cell
+
+        f = UpperField(
+            key="foo",
+            value=None,
+            field=CharField(),
+            style=style,
+            mapping=None,
+            cell_style=style,
+        )
+        styled = f.write(worksheet, 1, 1, "bar")
+        cell = f.write(worksheet, 2, 1, "baz", style=styled._style)
+        assert cell.value == "BAZ"
+        assert cell._style == styled._style
+        assert f.style_array is None
+
     def test_cell_with_mapping_str(self, style: XLSXStyle, worksheet: Worksheet):
         f = XLSXField(
             key="foo",
@@ -0,0 +1,92 @@
+import io
+import os
+from types import SimpleNamespace
+
+import pytest
+from django.core.files.storage import FileSystemStorage
+from PIL import Image
+
+from drf_excel import images
+from drf_excel.images import CachedImage, get_image, image_cache
+
+
+def _image_bytes(format="png", size=(20, 10)):
+    buffer = io.BytesIO()
+    Image.new(mode="RGB", size=size, color="blue").save(buffer, format=format)
+    return buffer.getvalue()
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    image_cache.clear()
+    yield
+    image_cache.clear()
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    calls = []
+    load = images._load
+
+    def counting_load(data):
+        calls.append(data)
+        return load(data)
+
+    monkeypatch.setattr(images, "_load", counting_load)
+    return calls
+
+
+def test_path(tmp_path, loads):
+    path = tmp_path / "logo.png"
+    path.write_bytes(_image_bytes())
+
+    img = get_image(str(path))
+    assert isinstance(img, CachedImage)
+    assert (img.width, img.height, img.format) == (20, 10, "png")
+    assert img._data() == path.read_bytes()
+
+    get_image(path)
+    assert len(loads) == 1
+
+
+def test_path_modified(tmp_path, loads):
+    path = tmp_path / "logo.png"
+    path.write_bytes(_image_bytes())
+    get_image(str(path))
+
+    path.write_bytes(_image_bytes(size=(30, 30)))
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    img = get_image(str(path))
+    assert (img.width, img.height) == (30, 30)
+    assert len(loads) == 2
+
+
+def test_bytes_and_file(loads):
+    data = _image_bytes(format="jpeg")
+    assert get_image(data).format == "jpeg"
+    assert get_image(io.BytesIO(data)).format == "jpeg"
+    assert len(loads) == 1
+
+
+def test_storage_file(tmp_path, loads):
+    storage = FileSystemStorage(location=tmp_path)
+    name = storage.save("logo.png", io.BytesIO(_image_bytes()))
+    source = SimpleNamespace(storage=storage, name=name)
+
+    assert get_image(source).width == 20
+    assert get_image(source).width == 20
+    assert len(loads) == 1
+
+
+def test_converted_to_png():
+    img = get_image(_image_bytes(format="bmp"))
+    assert img.format == "png"
+    assert Image.open(io.BytesIO(img._data())).format == "PNG"
+
+
+def test_bounded(monkeypatch):
+    monkeypatch.setattr(image_cache, "maxsize", 2)
+    for size in (1, 2, 3):
+        get_image(_image_bytes(size=(size, size)))
+    assert len(image_cache) == 2
@@ -0,0 +1,55 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Imported on the first render or upload only
+LAZY_MODULES = ("openpyxl", "PIL", "pyarrow", "drf_excel.fields", "drf_excel.images")
+
+
+def _import_times(*modules):
+    """
+    Returns the cumulative import time in microseconds of every module imported by
+    a fresh interpreter importing `modules` after the Django setup.
+    """
+    code = "import django; django.setup(); " + "; ".join(
+        f"import {module}" for module in modules
+    )
+    env = {
+        **os.environ,
+        "DJANGO_SETTINGS_MODULE": "tests.settings",
+        "PYTHONPATH": str(ROOT),
+    }
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        cwd=ROOT,
+        env=env,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.parametrize(
+    "module", ["drf_excel.renderers", "drf_excel.mixins", "drf_excel.parsers"]
+)
+def test_import_is_lazy(module):
+    times = _import_times(module)
+    assert module in times
+    assert not [
+        name
+        for name in times
+        if any(name == lazy or name.startswith(f"{lazy}.") for lazy in LAZY_MODULES)
+    ]
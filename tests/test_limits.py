@@ -0,0 +1,57 @@
+import pytest
+from django.core.cache import cache
+
+from drf_excel.limits import (
+    CacheExportLimiter,
+    ProcessExportLimiter,
+    admits,
+    get_export_limiter,
+)
+
+
+@pytest.mark.parametrize(
+    "count, active_cost, cost, max_concurrent, max_cost, expected",
+    [
+        (0, 0, 10, None, None, True),
+        (1, 5, 10, 2, None, True),
+        (2, 5, 10, 2, None, False),
+        (1, 50, 50, None, 100, True),
+        (1, 60, 50, None, 100, False),
+        # Exports above the budget run alone
+        (0, 0, 500, None, 100, True),
+        (1, 1, 500, None, 100, False),
+    ],
+)
+def test_admits(count, active_cost, cost, max_concurrent, max_cost, expected):
+    assert admits(count, active_cost, cost, max_concurrent, max_cost) is expected
+
+
+@pytest.fixture(params=["process", "cache"])
+def limiter(request):
+    if request.param == "process":
+        yield ProcessExportLimiter()
+        return
+    cache.clear()
+    yield CacheExportLimiter("test")
+    cache.clear()
+
+
+def test_limiter(limiter):
+    assert limiter.acquire(10, max_concurrent=2, max_cost=25)
+    assert limiter.acquire(10, max_concurrent=2, max_cost=25)
+    assert not limiter.acquire(1, max_concurrent=2, max_cost=25)
+    limiter.release(10)
+    assert not limiter.acquire(10, max_concurrent=2, max_cost=15)
+    assert limiter.acquire(5, max_concurrent=2, max_cost=15)
+    limiter.release(5)
+    limiter.release(10)
+    limiter.release(10)
+    assert limiter.acquire(100, max_concurrent=1, max_cost=15)
+
+
+def test_get_export_limiter():
+    assert get_export_limiter("process", "a") is get_export_limiter("process", "a")
+    assert get_export_limiter("process", "a") is not get_export_limiter("process", "b")
+    assert isinstance(get_export_limiter("cache", "a"), CacheExportLimiter)
+    with pytest.raises(ValueError):
+        get_export_limiter("nope")
@@ -0,0 +1,135 @@
+import datetime as dt
+import io
+
+import pytest
+from openpyxl import Workbook
+from rest_framework import serializers
+from rest_framework.exceptions import ParseError
+from rest_framework.generics import GenericAPIView
+
+from drf_excel.parsers import XLSXParser, XLSXRowIterator
+from drf_excel.renderers import XLSXRenderer
+
+
+class AuthorSerializer(serializers.Serializer):
+    name = serializers.CharField(label="Author name")
+
+
+class BookSerializer(serializers.Serializer):
+    title = serializers.CharField(label="Title")
+    published = serializers.DateField()
+    available = serializers.BooleanField()
+    tags = serializers.ListField(child=serializers.CharField())
+    author = AuthorSerializer()
+
+
+class BookView(GenericAPIView):
+    serializer_class = BookSerializer
+    header = {"use_header": True, "header_title": "Books"}
+    xlsx_boolean_labels = {True: "Yes", False: "No"}
+
+
+def make_view(view_class=BookView):
+    return view_class(request=None, format_kwarg=None)
+
+
+@pytest.fixture
+def books():
+    return [
+        {
+            "title": "=Dune",
+            "published": "1965-08-01",
+            "available": True,
+            "tags": ["sf", "classic"],
+            "author": {"name": "Frank Herbert"},
+        },
+        {
+            "title": "Emma",
+            "published": "1815-12-23",
+            "available": False,
+            "tags": [],
+            "author": {"name": "Jane Austen"},
+        },
+    ]
+
+
+def parse(content, view):
+    return XLSXParser().parse(io.BytesIO(content), parser_context={"view": view})
+
+
+@pytest.mark.usefixtures("xlsx_engine")
+def test_round_trip(books):
+    view = make_view()
+    content = XLSXRenderer().render(books, renderer_context={"view": view})
+
+    rows = parse(content, view)
+    assert isinstance(rows, XLSXRowIterator)
+    assert rows.header_row == 2
+    assert list(rows) == [
+        {
+            "title": "=Dune",
+            "published": dt.date(1965, 8, 1),
+            "available": True,
+            "tags": ["sf", "classic"],
+            "author": {"name": "Frank Herbert"},
+        },
+        {
+            "title": "Emma",
+            "published": dt.date(1815, 12, 23),
+            "available": False,
+            "tags": [],
+            "author": {"name": "Jane Austen"},
+        },
+    ]
+    serializer = BookSerializer(data=list(parse(content, view)), many=True)
+    serializer.is_valid(raise_exception=True)
+
+
+@pytest.mark.usefixtures("xlsx_engine")
+def test_round_trip_with_labels(books):
+    class LabelView(BookView):
+        xlsx_use_labels = True
+
+    view = make_view(LabelView)
+    content = XLSXRenderer().render(books, renderer_context={"view": view})
+
+    rows = list(parse(content, make_view()))
+    assert rows[1]["author"] == {"name": "Jane Austen"}
+
+
+def test_lazy_rows():
+    wb = Workbook()
+    wb.active.append(["title", "unknown"])
+    for i in range(5):
+        wb.active.append([f"book {i}", "ignored"])
+    wb.active.append([None, None])
+    wb.active.append(["last", None])
+    buffer = io.BytesIO()
+    wb.save(buffer)
+
+    rows = parse(buffer.getvalue(), make_view())
+    assert next(rows) == {"title": "book 0"}
+    assert rows.row_number == 2
+    assert [row["title"] for row in rows] == [
+        "book 1",
+        "book 2",
+        "book 3",
+        "book 4",
+        "last",
+    ]
+    assert rows.row_number == 8
+
+
+def test_invalid_file():
+    with pytest.raises(ParseError, match="XLSX parse error"):
+        parse(b"not a workbook", make_view())
+
+
+def test_no_header():
+    wb = Workbook()
+    wb.active.append(["something", "else"])
+    buffer = io.BytesIO()
+    wb.save(buffer)
+
+    with pytest.raises(ParseError, match="no column header found"):
+        parse(buffer.getvalue(), make_view())
@@ -0,0 +1,52 @@
+import pytest
+from django.core.cache import cache
+
+from drf_excel.progress import CacheProgressSink, ExportProgress
+
+
+class MemorySink:
+    def __init__(self):
+        self.states = []
+
+    def publish(self, key, state):
+        self.states.append((key, state))
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("drf_excel.progress.time.monotonic", lambda: now[0])
+    return now
+
+
+def test_export_progress(clock):
+    sink = MemorySink()
+    progress = ExportProgress(sink, "key", interval=1.0)
+    progress.set_phase("writing", total=3000)
+    progress.advance(1000)
+    clock[0] += 1.5
+    progress.advance(1000)
+    progress.advance(500)
+    progress.finish()
+    assert sink.states == [
+        ("key", {"phase": "writing", "rows": 0, "total": 3000}),
+        ("key", {"phase": "writing", "rows": 2000, "total": 3000}),
+        ("key", {"phase": "done", "rows": 3000, "total": 3000}),
+    ]
+
+
+def test_export_progress_failed():
+    sink = MemorySink()
+    progress = ExportProgress(sink, "key")
+    progress.set_phase("serializing")
+    progress.finish(failed=True)
+    assert sink.states[-1] == ("key", {"phase": "failed", "rows": 0, "total": None})
+
+
+def test_cache_progress_sink():
+    cache.clear()
+    sink = CacheProgressSink()
+    assert sink.get("key") is None
+    sink.publish("key", {"phase": "done"})
+    assert sink.get("key") == {"phase": "done"}
+    cache.clear()
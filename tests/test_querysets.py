@@ -0,0 +1,134 @@
+import pytest
+from rest_framework import serializers
+
+from drf_excel.querysets import optimize_queryset, prune_serializer
+from tests.testapp.models import AllFieldsModel, Book
+from tests.testapp.serializers import BookSerializer
+
+
+def _plan(queryset):
+    query = queryset.query
+    names, defer = query.deferred_loading
+    only = set() if defer else set(names)
+    return query.select_related, set(queryset._prefetch_related_lookups), only
+
+
+@pytest.mark.django_db
+class TestOptimizeQueryset:
+    def test_nested_and_many_related(self):
+        queryset = optimize_queryset(
+            Book.objects.all(),
+            BookSerializer(),
+            ["title", "author.name", "tags"],
+        )
+        select_related, prefetch_related, only = _plan(queryset)
+        assert select_related == {"author": {}}
+        assert prefetch_related == {"tags"}
+        # Prefetched relations need the full objects
+        assert only == set()
+
+    def test_only_columns(self):
+        class BookPkSerializer(serializers.ModelSerializer):
+            author_name = serializers.CharField(source="author.name")
+
+            class Meta:
+                model = Book
+                fields = ("title", "author", "author_name")
+
+        queryset = optimize_queryset(
+            Book.objects.all(),
+            BookPkSerializer(),
+            ["title", "author", "author_name"],
+        )
+        select_related, prefetch_related, only = _plan(queryset)
+        assert select_related == {"author": {}}
+        assert prefetch_related == set()
+        assert only == {"title", "author", "author__name"}
+
+    def test_method_field_disables_only(self):
+        class TitleSerializer(serializers.ModelSerializer):
+            upper = serializers.SerializerMethodField()
+
+            class Meta:
+                model = AllFieldsModel
+                fields = ("title", "upper")
+
+            def get_upper(self, instance):
+                return instance.title.upper()
+
+        queryset = optimize_queryset(
+            AllFieldsModel.objects.all(), TitleSerializer(), ["title", "upper"]
+        )
+        assert _plan(queryset) == (False, set(), set())
+
+    def test_overrides(self):
+        queryset = optimize_queryset(
+            Book.objects.all(),
+            BookSerializer(),
+            ["title", "author.name", "tags"],
+            select_related=[],
+            prefetch_related=["tags__books"],
+        )
+        select_related, prefetch_related, _ = _plan(queryset)
+        assert select_related is False
+        assert prefetch_related == {"tags__books"}
+
+    @pytest.mark.parametrize(
+        "queryset",
+        [
+            Book.objects.select_related("author"),
+            Book.objects.only("title", "summary"),
+        ],
+    )
+    def test_custom_queryset_keeps_columns(self, queryset):
+        class TitleSerializer(serializers.ModelSerializer):
+            class Meta:
+                model = Book
+                fields = ("title",)
+
+        optimized = optimize_queryset(queryset, TitleSerializer(), ["title"])
+        assert optimized.query.deferred_loading == queryset.query.deferred_loading
+        # Not a FieldError from a relation both deferred and selected
+        assert list(optimized) == []
+
+
+class TestPruneSerializer:
+    def test_prune_keys_and_write_only(self):
+        class SecretBookSerializer(BookSerializer):
+            secret = serializers.CharField(write_only=True)
+
+            class Meta(BookSerializer.Meta):
+                fields = ("title", "author", "tags", "secret")
+
+        serializer = prune_serializer(SecretBookSerializer(), ["tags"])
+        assert list(serializer.fields) == ["title", "author"]
+
+    def test_prune_empty_nested(self):
+        serializer = prune_serializer(BookSerializer(), ["author.name"])
+        assert list(serializer.fields) == ["title", "tags"]
+
+    def test_prune_many(self):
+        serializer = prune_serializer(BookSerializer(many=True), ["author"])
+        assert list(serializer.child.fields) == ["title", "tags"]
+
+
+@pytest.mark.django_db
+def test_defer_excluded_columns():
+    class SummarySerializer(serializers.ModelSerializer):
+        author_name = serializers.CharField(source="author.name")
+        upper = serializers.SerializerMethodField()
+
+        class Meta:
+            model = Book
+            fields = ("title", "summary", "author_name", "upper")
+
+        def get_upper(self, instance):
+            return instance.title.upper()
+
+    queryset = optimize_queryset(
+        Book.objects.all(),
+        SummarySerializer(),
+        ["title", "author_name", "upper"],
+        excluded_keys=["summary"],
+    )
+    assert queryset.query.deferred_loading == ({"summary"}, True)
@@ -1,9 +1,20 @@
+import io
+import zipfile
+
+import pytest
+from django.http import HttpResponse
+from django.utils import translation
+from django.utils.functional import lazy
+from django.utils.translation import get_language, gettext_lazy
+from openpyxl import load_workbook
 from PIL import Image
 from rest_framework import serializers
 from rest_framework.generics import GenericAPIView
 from rest_framework.response import Response
 
-from drf_excel.renderers import XLSXRenderer
+from drf_excel.compiler import XLSXRows
+from drf_excel.renderers import _MISSING, XLSXRenderer, template_cache
+from drf_excel.utilities import batch_formatter
 
 
 class MySerializer(serializers.Serializer):
@@ -17,6 +28,7 @@ class MyBaseView(GenericAPIView):
         return Response({"title": "example"})
 
 
+@pytest.mark.usefixtures("xlsx_engine")
 class TestXLSXRenderer:
     renderer = XLSXRenderer()
 
@@ -48,3 +60,832 @@ class TestXLSXRenderer:
         row0_col0 = rows[0][0]
         assert row0_col0.value == "My Header"
         assert row0_col0.font.name == "Arial"
+
+    def test_auto_column_width(self, xlsx_engine):
+        class MyView(MyBaseView):
+            column_header = {"column_width": "auto", "auto_width_max": 30}
+
+        data = [
+            {"title": "short"},
+            {"title": "a much longer title"},
+            {"title": "x" * 100},
+        ]
+        result = self.renderer.render(
+            data, renderer_context={"view": MyView(request=None, format_kwarg=None)}
+        )
+        wb = load_workbook(io.BytesIO(result))
+        # Only the titles are known before `write_only` streams the rows
+        expected = 8 if xlsx_engine == "write_only" else 30
+        assert wb.active.column_dimensions["A"].width == expected
+
+    def test_auto_column_width_sample(self, xlsx_engine):
+        class MyView(MyBaseView):
+            column_header = {"column_width": "auto", "auto_width_sample": 2}
+
+        data = [
+            {"title": "short"},
+            {"title": "a much longer title"},
+            {"title": "x" * 100},
+        ]
+        result = self.renderer.render(
+            data, renderer_context={"view": MyView(request=None, format_kwarg=None)}
+        )
+        wb = load_workbook(io.BytesIO(result))
+        expected = 8 if xlsx_engine == "write_only" else len("a much longer title") + 2
+        assert wb.active.column_dimensions["A"].width == expected
+
+    def test_auto_column_width_from_view_lengths(self):
+        class MyView(MyBaseView):
+            column_header = {"column_width": "auto"}
+
+            def get_xlsx_column_lengths(self, fields_dict):
+                return {"title": 40}
+
+        data = [{"title": "short"}]
+        result = self.renderer.render(
+            data, renderer_context={"view": MyView(request=None, format_kwarg=None)}
+        )
+        wb = load_workbook(io.BytesIO(result))
+        assert wb.active.column_dimensions["A"].width == 42
+
+
+class TestCompiledAccessors:
+    @pytest.fixture
+    def renderer(self):
+        renderer = XLSXRenderer()
+        renderer.combined_header_dict = {
+            "title": "title",
+            "author.name": "author.name",
+            "author.address.city": "author.address.city",
+            "row_color": "row_color",
+        }
+        renderer.column_accessors = renderer._compile_accessors()
+        renderer.column_data_styles = {}
+        renderer.custom_cols = {}
+        renderer.custom_mappings = {}
+        return renderer
+
+    def test_compile_accessors(self, renderer):
+        assert renderer.column_accessors == [
+            ("title", ("title",)),
+            ("author.name", ("author", "name")),
+            ("author.address.city", ("author", "address", "city")),
+        ]
+
+    def test_nested_row(self, renderer):
+        row = {
+            "title": "Book",
+            "author": {"name": gettext_lazy("Jane"), "address": {"city": "Paris"}},
+        }
+        assert renderer._row_values(row) == ["Book", "Jane", "Paris"]
+
+    def test_missing_values(self, renderer):
+        row = {"title": "Book", "author": None}
+        assert renderer._row_values(row) == ["Book", _MISSING, _MISSING]
+
+    def test_mapping_leaf_is_missing(self, renderer):
+        row = {"title": {"nested": 1}, "author": {"name": "Jane", "address": {}}}
+        assert renderer._row_values(row) == [_MISSING, "Jane", _MISSING]
+
+    def test_fallback_for_dotted_keys(self, renderer):
+        row = {"title": "Book", "author.name": "Jane", "author": {"address": None}}
+        assert renderer._row_values(row) == ["Book", "Jane", _MISSING]
+
+    def test_same_values_as_flatten_data(self, renderer):
+        row = {"title": "Book", "author": {"name": "Jane", "address": {"city": "X"}}}
+        flattened = renderer._flatten_data(row)
+        assert renderer._row_values(row) == [
+            flattened[key].value for key, _ in renderer.column_accessors
+        ]
+
+    def test_compiled_rows_in_column_order(self, renderer):
+        row_values = renderer._compiled_row_values(
+            ("title", "author.name", "author.address.city")
+        )
+        row = ("Book", "Jane", "Paris")
+        assert row_values(row) is row
+
+    def test_compiled_rows_reordered(self, renderer):
+        row_values = renderer._compiled_row_values(("author.name", "title"))
+        assert row_values(("Jane", "Book")) == ["Book", "Jane", _MISSING]
+
+    def test_compiled_row_color(self, renderer):
+        renderer.compiled_row_color = True
+        assert renderer._row_color(("Book", "FFFFFFCC")) == "FFFFFFCC"
+        renderer.compiled_row_color = False
+        assert renderer._row_color(("Book",)) is _MISSING
+        assert renderer._row_color({"row_color": "FF000000"}) == "FF000000"
+
+
+@pytest.mark.usefixtures("xlsx_engine")
+class TestBatchFormatters:
+    renderer = XLSXRenderer()
+
+    def test_batch_custom_mapping(self):
+        calls = []
+
+        @batch_formatter
+        def upper_titles(values):
+            calls.append(values)
+            return [value.upper() for value in values]
+
+        class MyView(MyBaseView):
+            xlsx_custom_mappings = {"title": upper_titles}
+            xlsx_batch_size = 2
+
+        data = [{"title": "a"}, {"title": "b"}, {"title": "c"}]
+        result = self.renderer.render(
+            data, renderer_context={"view": MyView(request=None, format_kwarg=None)}
+        )
+        sheet = load_workbook(io.BytesIO(result)).active
+        assert [row[0].value for row in sheet.iter_rows(min_row=2)] == ["A", "B", "C"]
+        assert calls == [["a", "b"], ["c"]]
+
+    def test_batch_custom_col_skips_missing_values(self):
+        calls = []
+
+        @batch_formatter
+        def lookup(values):
+            calls.append(values)
+            return [f"#{value}" for value in values]
+
+        class MyView(MyBaseView):
+            xlsx_custom_cols = {"extra.id": {"label": "Extra", "formatter": lookup}}
+            xlsx_batch_size = None
+
+        data = [
+            {"title": "a", "extra": {"id": 1}},
+            {"title": "b", "extra": None},
+            {"title": "c", "extra": {"id": 3}},
+        ]
+        result = self.renderer.render(
+            data, renderer_context={"view": MyView(request=None, format_kwarg=None)}
+        )
+        sheet = load_workbook(io.BytesIO(result)).active
+        assert [row[1].value for row in sheet.iter_rows(min_row=2)] == [
+            "#1",
+            None,
+            "#3",
+        ]
+        assert calls == [[1, 3]]
+
+    def test_batch_formatter_wrong_length(self):
+        class MyView(MyBaseView):
+            xlsx_custom_mappings = {"title": batch_formatter(lambda values: [])}
+
+        with pytest.raises(ValueError, match="returned 0 values for 1 rows"):
+            self.renderer.render(
+                [{"title": "a"}],
+                renderer_context={"view": MyView(request=None, format_kwarg=None)},
+            )
+
+
+@pytest.mark.usefixtures("xlsx_engine")
+class TestColumnFields:
+    class MyView(MyBaseView):
+        class serializer_class(serializers.Serializer):
+            title = serializers.CharField()
+            count = serializers.IntegerField()
+            flag = serializers.BooleanField()
+            extra = serializers.SerializerMethodField()
+
+        xlsx_boolean_labels = {True: "Yes", False: "No"}
+
+    data = [
+        {"title": "=a", "count": "1", "flag": True, "extra": ["x", "y"]},
+        {"title": "b", "count": 2, "flag": False, "extra": "z"},
+        {"title": "c", "count": None, "flag": None, "extra": [1]},
+    ]
+
+    class CountingRenderer(XLSXRenderer):
+        def _drf_to_xlsx_field(self, key, value, mapping=None):
+            self.field_count += 1
+            return super()._drf_to_xlsx_field(key, value, mapping)
+
+    def _render(self, renderer):
+        renderer.field_count = 0
+        result = renderer.render(
+            self.data,
+            renderer_context={"view": self.MyView(request=None, format_kwarg=None)},
+        )
+        sheet = load_workbook(io.BytesIO(result)).active
+        return [
+            [(cell.value, cell.number_format) for cell in row]
+            for row in sheet.iter_rows(min_row=2)
+        ]
+
+    def test_one_field_per_column(self):
+        renderer = self.CountingRenderer()
+        assert self._render(renderer) == [
+            [("'=a", "General"), (1, "0"), ("Yes", "General"), ("x, y", "General")],
+            [("b", "General"), (2, "0"), ("No", "General"), ("z", "General")],
+            [("c", "General"), (None, "0"), ("None", "General"), ("1", "General")],
+        ]
+        # The method field gets a list field and a plain one
+        assert renderer.field_count == 5
+
+    def test_field_per_cell(self):
+        renderer = self.CountingRenderer()
+        renderer.shared_column_fields = False
+        assert self._render(renderer) == self._render(XLSXRenderer())
+        assert renderer.field_count == 12
+
+
+class TestSheetDefaults:
+    class MyView(MyBaseView):
+        class serializer_class(serializers.Serializer):
+            title = serializers.CharField()
+            count = serializers.IntegerField()
+
+        body = {"style": {"font": {"bold": True}}, "height": 22}
+        column_data_styles = {"count": {"format": "0.0"}}
+
+    data = [{"title": "a", "count": 1}, {"title": "b"}, {"title": "c", "count": 3}]
+
+    def _render(self, **body):
+        view = self.MyView(request=None, format_kwarg=None)
+        view.body = {**view.body, **body}
+        result = XLSXRenderer().render(self.data, renderer_context={"view": view})
+        return load_workbook(io.BytesIO(result)).active
+
+    @staticmethod
+    def _cells(sheet):
+        return [
+            (cell.coordinate, cell.value, cell.font.b, cell.number_format)
+            for row in sheet.iter_rows(min_row=2)
+            for cell in row
+            if cell.value is not None
+        ]
+
+    @pytest.mark.parametrize("engine", ["openpyxl", "write_only", "xlsxwriter"])
+    def test_sheet_defaults(self, engine):
+        self.MyView.xlsx_engine = engine
+        try:
+            sheet = self._render(sheet_defaults=True)
+        finally:
+            del self.MyView.xlsx_engine
+        # The missing count is left out instead of written unstyled
+        assert sheet._cells.get((3, 2)) is None
+        assert self._cells(sheet) == self._cells(self._render())
+        assert sheet.sheet_format.defaultRowHeight == 22
+        assert sheet.sheet_format.customHeight
+        # Only the column header has its own height
+        assert {
+            row: dimension.height
+            for row, dimension in sheet.row_dimensions.items()
+            if dimension.height != 22
+        } == {1: 45}
+        assert sheet.column_dimensions["A"].font.b
+        assert sheet.column_dimensions["B"].number_format == "0.0"
+
+    @pytest.mark.usefixtures("xlsx_engine")
+    def test_row_color_keeps_missing_cells(self):
+        self.data = [{"title": "a", "row_color": "FFFF0000"}]
+        sheet = self._render(sheet_defaults=True)
+        assert sheet["B2"].fill.fgColor.rgb == "FFFF0000"
+
+
+class TestTable:
+    class MyView(MyBaseView):
+        class serializer_class(serializers.Serializer):
+            title = serializers.CharField(label="Title")
+            name = serializers.CharField(label="Title")
+
+        xlsx_use_labels = True
+        xlsx_table = True
+        header = {"use_header": True, "header_title": "Books"}
+        column_header = {"style": {"font": {"bold": True}}}
+        body = {"style": {"font": {"bold": True}}}
+
+    data = [{"title": f"title {i}", "name": f"name {i}"} for i in range(3)]
+
+    def _render(self, **attrs):
+        view = self.MyView(request=None, format_kwarg=None)
+        view.__dict__.update(attrs)
+        result = XLSXRenderer().render(self.data, renderer_context={"view": view})
+        return load_workbook(io.BytesIO(result))
+
+    @pytest.mark.parametrize("engine", ["openpyxl", "write_only", "xlsxwriter"])
+    def test_table(self, engine):
+        sheet = self._render(xlsx_engine=engine).active
+        table = sheet.tables["Report"]
+        assert table.ref == "A2:B5"
+        assert table.autoFilter.ref == "A2:B5"
+        assert table.tableStyleInfo.name == "TableStyleMedium9"
+        assert table.tableStyleInfo.showRowStripes
+        # Unique column names, matching the header cells
+        assert [column.name for column in table.tableColumns] == ["Title", "Title (2)"]
+        assert [cell.value for cell in sheet[2]] == ["Title", "Title (2)"]
+        # Styled by the table only
+        assert not sheet["A2"].font.b
+        assert not sheet["A3"].font.b
+
+    @pytest.mark.usefixtures("xlsx_engine")
+    def test_table_options(self):
+        table_options = {"name": "Books", "style": "TableStyleLight1"}
+        sheet = self._render(xlsx_table=table_options).active
+        assert sheet.tables["Books"].tableStyleInfo.name == "TableStyleLight1"
+
+    @pytest.mark.usefixtures("xlsx_engine")
+    def test_table_per_sheet(self):
+        wb = self._render(xlsx_overflow="sheets", xlsx_max_rows=4)
+        assert [list(sheet.tables.items()) for sheet in wb.worksheets] == [
+            [("Report", "A2:B4")],
+            [("Report2", "A2:B3")],
+        ]
+
+    @pytest.mark.usefixtures("xlsx_engine")
+    def test_no_rows(self):
+        self.data = []
+        sheet = self._render().active
+        assert sheet.tables == {}
+
+
+class TestChildSheets:
+    class LineSerializer(serializers.Serializer):
+        product = serializers.CharField()
+        quantity = serializers.IntegerField(label="Qty")
+
+    class MyView(MyBaseView):
+        class serializer_class(serializers.Serializer):
+            id = serializers.IntegerField()
+            title = serializers.CharField()
+            lines = serializers.ListField()
+
+        xlsx_child_sheets = {"lines": {"title": "Lines"}}
+
+    data = [
+        {"id": 1, "title": "a", "lines": [{"product": "x", "quantity": 2}]},
+        {"id": 2, "title": "b", "lines": []},
+        {
+            "id": 3,
+            "title": "c",
+            "lines": [{"product": "y", "quantity": 1}, {"product": "z"}],
+        },
+    ]
+
+    def _render(self, data=None, **attrs):
+        view = self.MyView(request=None, format_kwarg=None)
+        view.__dict__.update(attrs)
+        result = XLSXRenderer().render(
+            self.data if data is None else data, renderer_context={"view": view}
+        )
+        wb = load_workbook(io.BytesIO(result))
+        return {
+            sheet.title: [[cell.value for cell in row] for row in sheet.iter_rows()]
+            for sheet in wb.worksheets
+        }
+
+    @pytest.mark.parametrize("engine", ["openpyxl", "write_only", "xlsxwriter"])
+    def test_child_sheet(self, engine):
+        assert self._render(xlsx_engine=engine) == {
+            "Report": [["id", "title"], [1, "a"], [2, "b"], [3, "c"]],
+            "Lines": [
+                ["id", "product", "quantity"],
+                # Without a serializer field, values are written as text
+                [1, "x", "2"],
+                [3, "y", "1"],
+                [3, "z", None],
+            ],
+        }
+
+    @pytest.mark.usefixtures("xlsx_engine")
+    def test_child_sheet_overflow(self):
+        sheets = self._render(xlsx_overflow="sheets", xlsx_max_rows=3)
+        assert sheets == {
+            "Report": [["id", "title"], [1, "a"], [2, "b"]],
+            "Lines": [["id", "product", "quantity"], [1, "x", "2"], [3, "y", "1"]],
+            "Report (2)": [["id", "title"], [3, "c"]],
+            "Lines (2)": [["id", "product", "quantity"], [3, "z", None]],
+        }
+
+    @pytest.mark.usefixtures("xlsx_engine")
+    def test_child_serializer_columns(self):
+        class MyView(self.MyView):
+            class serializer_class(serializers.Serializer):
+                id = serializers.IntegerField()
+                title = serializers.CharField()
+                lines = TestChildSheets.LineSerializer(many=True)
+
+            xlsx_use_labels = True
+            xlsx_child_sheets = {"lines": {"parent_key": "title"}}
+
+        self.MyView = MyView
+        sheets = self._render()
+        assert sheets["lines"] == [
+            ["title", "product", "Qty"],
+            ["a", "x", 2],
+            ["c", "y", 1],
+            ["c", "z", None],
+        ]
+
+    @pytest.mark.usefixtures("xlsx_engine")
+    def test_compiled_rows(self):
+        data = XLSXRows(
+            [(1, "a", [{"product": "x", "quantity": 2}]), (2, "b", None)],
+            ("id", "title", "lines"),
+        )
+        assert self._render(data) == {
+            "Report": [["id", "title"], [1, "a"], [2, "b"]],
+            "Lines": [["id", "product", "quantity"], [1, "x", "2"]],
+        }
+
+
+@pytest.mark.usefixtures("xlsx_engine")
+class TestOverflow:
+    renderer = XLSXRenderer()
+    data = [{"title": f"row {i}"} for i in range(7)]
+
+    def test_overflow_sheets(self, xlsx_engine):
+        class MyView(MyBaseView):
+            header = {"use_header": True, "tab_title": "Books"}
+            xlsx_max_rows = 5
+
+        result = self.renderer.render(
+            self.data,
+            renderer_context={"view": MyView(request=None, format_kwarg=None)},
+        )
+        wb = load_workbook(io.BytesIO(result))
+        assert wb.sheetnames == ["Books", "Books (2)", "Books (3)"]
+        values = [
+            [row[0].value for row in sheet.iter_rows()] for sheet in wb.worksheets
+        ]
+        assert values == [
+            ["Report", "title", "row 0", "row 1", "row 2"],
+            ["Report", "title", "row 3", "row 4", "row 5"],
+            ["Report", "title", "row 6"],
+        ]
+        if xlsx_engine != "xlsxwriter":
+            # XlsxWriter doesn't merge the single cell of the header
+            assert all(sheet.merged_cells.ranges for sheet in wb.worksheets)
+
+    def test_overflow_disabled(self):
+        class MyView(MyBaseView):
+            xlsx_max_rows = 5
+            xlsx_overflow = None
+
+        result = self.renderer.render(
+            self.data,
+            renderer_context={"view": MyView(request=None, format_kwarg=None)},
+        )
+        wb = load_workbook(io.BytesIO(result))
+        assert wb.sheetnames == ["Report"]
+        assert wb.active.max_row == 8
+
+    def test_overflow_zip(self):
+        class MyView(MyBaseView):
+            xlsx_max_rows = 4
+            xlsx_overflow = "zip"
+
+            def get_filename(self, request=None, *args, **kwargs):
+                return "books.xlsx"
+
+        response = HttpResponse(content_type=XLSXRenderer.media_type)
+        response["content-disposition"] = "attachment; filename=books.xlsx"
+        result = self.renderer.render(
+            self.data,
+            renderer_context={
+                "view": MyView(request=None, format_kwarg=None),
+                "response": response,
+            },
+        )
+        assert response["Content-Type"] == "application/zip"
+        assert response["content-disposition"] == "attachment; filename=books.zip"
+        with zipfile.ZipFile(io.BytesIO(result)) as archive:
+            assert archive.namelist() == [
+                "books.xlsx",
+                "books (2).xlsx",
+                "books (3).xlsx",
+            ]
+            wb = load_workbook(io.BytesIO(archive.read("books (3).xlsx")))
+        assert [row[0].value for row in wb.active.iter_rows()] == ["title", "row 6"]
+
+    def test_overflow_zip_not_needed(self):
+        class MyView(MyBaseView):
+            xlsx_overflow = "zip"
+
+        result = self.renderer.render(
+            self.data,
+            renderer_context={"view": MyView(request=None, format_kwarg=None)},
+        )
+        assert load_workbook(io.BytesIO(result)).sheetnames == ["Report"]
+
+    def test_invalid_overflow(self):
+        class MyView(MyBaseView):
+            xlsx_overflow = "split"
+
+        with pytest.raises(ValueError, match="Invalid xlsx_overflow"):
+            self.renderer.render(
+                self.data,
+                renderer_context={"view": MyView(request=None, format_kwarg=None)},
+            )
+
+
+class TestWriteOnlyEngine:
+    renderer = XLSXRenderer()
+    data = [{"title": f"row {i}"} for i in range(5)] + [{"title": "=1+1"}]
+
+    def _render(self, engine, **attrs):
+        MyView = type("MyView", (MyBaseView,), {"xlsx_engine": engine, **attrs})
+        result = self.renderer.render(
+            self.data,
+            renderer_context={"view": MyView(request=None, format_kwarg=None)},
+        )
+        return load_workbook(io.BytesIO(result))
+
+    def _dump(self, wb):
+        return [
+            (
+                sheet.title,
+                [
+                    [(cell.value, cell.font.b, cell.fill.fgColor.rgb) for cell in row]
+                    for row in sheet.iter_rows()
+                ],
+                # XlsxWriter leaves out merges of a single cell
+                [
+                    str(merged)
+                    for merged in sheet.merged_cells.ranges
+                    if merged.size != {"rows": 1, "columns": 1}
+                ],
+                {
+                    row: dimension.height
+                    for row, dimension in sheet.row_dimensions.items()
+                },
+                sheet.column_dimensions["A"].width,
+                sheet.sheet_view.rightToLeft,
+            )
+            for sheet in wb.worksheets
+        ]
+
+    @pytest.mark.parametrize("engine", ["write_only", "xlsxwriter"])
+    @pytest.mark.parametrize("overflow", [None, "sheets"])
+    def test_same_workbook(self, overflow, engine):
+        attrs = {
+            "header": {
+                "use_header": True,
+                "header_title": "Books",
+                "style": {"font": {"bold": True}},
+            },
+            "column_header": {"column_width": [30], "height": 20},
+            "body": {"height": 18},
+            "sheet_view_options": {"rightToLeft": True},
+            "xlsx_overflow": overflow,
+            "xlsx_max_rows": 4,
+        }
+        expected = self._dump(self._render("openpyxl", **attrs))
+        assert self._dump(self._render(engine, **attrs)) == expected
+
+    def test_auto_width(self):
+        wb = self._render("write_only", column_header={"column_width": "auto"})
+        # Only the titles are known before the rows are streamed
+        assert wb.active.column_dimensions["A"].width == 8
+
+    def test_invalid_engine(self):
+        with pytest.raises(ValueError, match="Invalid xlsx_engine"):
+            self._render("xlwt")
+
+    @pytest.mark.parametrize("engine", ["openpyxl", "write_only", "xlsxwriter"])
+    def test_invalid_tab_title(self, engine):
+        with pytest.raises(ValueError, match="Invalid character / found"):
+            self._render(engine, header={"tab_title": "Bad/Name"})
+
+    @pytest.mark.parametrize("engine", ["openpyxl", "write_only", "xlsxwriter"])
+    def test_long_tab_title(self, engine):
+        wb = self._render(
+            engine,
+            header={"tab_title": "Quarterly revenue by regionXX"},
+            xlsx_overflow="sheets",
+            xlsx_max_rows=4,
+        )
+        assert wb.sheetnames == [
+            "Quarterly revenue by regionXX",
+            "Quarterly revenue by region (2)",
+            "Quarterly revenue by region (3)",
+        ]
+
+
+def _rgb(color):
+    return color.rgb if color is not None and color.type == "rgb" else None
+
+
+class TestXlsxWriterEngine:
+    class MyView(MyBaseView):
+        class serializer_class(serializers.Serializer):
+            title = serializers.CharField()
+            price = serializers.DecimalField(max_digits=6, decimal_places=2)
+            published = serializers.DateField()
+            available = serializers.BooleanField()
+
+        header = {
+            "use_header": True,
+            "header_title": "Books",
+            "height": 30,
+            "style": {
+                "fill": {"fill_type": "solid", "start_color": "FFCCFFCC"},
+                "alignment": {"horizontal": "center", "vertical": "center"},
+                "border_side": {"border_style": "thin", "color": "FF0000FF"},
+                "font": {"name": "Arial", "size": 14, "bold": True},
+            },
+        }
+        column_header = {
+            "column_width": [20, 10, 12, 8],
+            "style": {"font": {"italic": True, "underline": "single"}},
+        }
+        body = {"style": {"alignment": {"wrapText": True}}}
+        column_data_styles = {
+            "price": {"format": "0.00", "font": {"color": "FFFF0000"}}
+        }
+        sheet_view_options = {"showGridLines": False, "zoomScale": 80}
+
+    data = [
+        {
+            "title": "Emma",
+            "price": "9.50",
+            "published": "1815-12-23",
+            "available": True,
+        },
+        {"title": "Persuasion", "price": "12.00", "published": "1817-12-20"},
+    ]
+
+    def _render(self, engine, **attrs):
+        view = self.MyView(request=None, format_kwarg=None)
+        view.__dict__.update(xlsx_engine=engine, **attrs)
+        result = XLSXRenderer().render(self.data, renderer_context={"view": view})
+        return load_workbook(io.BytesIO(result))
+
+    @staticmethod
+    def _dump(sheet):
+        return (
+            [
+                [
+                    (
+                        cell.value,
+                        cell.number_format,
+                        # XlsxWriter writes the default font of the workbook
+                        cell.font.name or "Calibri",
+                        cell.font.sz or 11,
+                        cell.font.b,
+                        cell.font.i,
+                        cell.font.u,
+                        _rgb(cell.font.color),
+                        cell.fill.fill_type,
+                        _rgb(cell.fill.fgColor) if cell.fill.fill_type else None,
+                        cell.border.left.style,
+                        _rgb(cell.border.left.color),
+                        cell.alignment.horizontal,
+                        cell.alignment.vertical,
+                        bool(cell.alignment.wrap_text),
+                    )
+                    for cell in row
+                ]
+                for row in sheet.iter_rows()
+            ],
+            [sheet.column_dimensions[col].width for col in "ABCD"],
+            sheet.row_dimensions[1].height,
+            sheet.sheet_view.showGridLines,
+            sheet.sheet_view.zoomScale,
+        )
+
+    def test_same_cells_and_styles(self):
+        expected = self._dump(self._render("openpyxl").active)
+        assert self._dump(self._render("xlsxwriter").active) == expected
+
+    def test_image(self, tmp_path):
+        image_path = tmp_path / "image.png"
+        with Image.new(mode="RGB", size=(100, 100), color="blue") as img:
+            img.save(image_path, format="png")
+        header = {**self.MyView.header, "img": str(image_path)}
+        sheet = self._render("xlsxwriter", header=header).active
+        assert len(sheet._images) == 1
+        assert sheet["A1"].value == "Books"
+
+    def test_overflow_zip(self):
+        view = self.MyView(request=None, format_kwarg=None)
+        view.__dict__.update(xlsx_engine="xlsxwriter", xlsx_overflow="zip")
+        view.xlsx_max_rows = 3
+        result = XLSXRenderer().render(self.data, renderer_context={"view": view})
+        with zipfile.ZipFile(io.BytesIO(result)) as archive:
+            titles = [
+                [row[0] for row in load_workbook(archive.open(name)).active.values]
+                for name in archive.namelist()
+            ]
+        assert titles == [["Books", "title", "Emma"], ["Books", "title", "Persuasion"]]
+
+    def test_engine_setting(self, settings):
+        settings.DRF_EXCEL_ENGINE = "xlsxwriter"
+        renderer = XLSXRenderer()
+        view = self.MyView(request=None, format_kwarg=None)
+        renderer.render(self.data, renderer_context={"view": view})
+        assert renderer.engine == "xlsxwriter"
+
+
+@pytest.mark.usefixtures("xlsx_engine")
+class TestTemplateCache:
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        template_cache.clear()
+        yield
+        template_cache.clear()
+
+    def _make_view(self, calls, **attrs):
+        class MyView(MyBaseView):
+            xlsx_cache_template = True
+            header = {"use_header": True, "header_title": "Books"}
+            column_data_styles = {"title": {"font": {"bold": True}}}
+
+            def get_serializer(self, *args, **kwargs):
+                calls.append(1)
+                return super().get_serializer(*args, **kwargs)
+
+        for name, value in attrs.items():
+            setattr(MyView, name, value)
+        return MyView(request=None, format_kwarg=None)
+
+    def test_template_reused(self):
+        calls = []
+        view = self._make_view(calls)
+        for title in ("first", "second"):
+            result = XLSXRenderer().render(
+                [{"title": title}], renderer_context={"view": view}
+            )
+            sheet = load_workbook(io.BytesIO(result)).active
+            assert [row[0].value for row in sheet.iter_rows()] == [
+                "Books",
+                "title",
+                title,
+            ]
+            assert sheet["A3"].font.bold is True
+        # Serializer fields are only inspected for the first export
+        assert len(calls) == 2
+        assert len(template_cache) == 1
+
+    def test_template_keyed_by_configuration(self):
+        calls = []
+        XLSXRenderer().render(
+            [{"title": "a"}], renderer_context={"view": self._make_view(calls)}
+        )
+        view = self._make_view(calls, header={"header_title": "Other"})
+        result = XLSXRenderer().render(
+            [{"title": "a"}], renderer_context={"view": view}
+        )
+        assert load_workbook(io.BytesIO(result)).active["A1"].value == "Other"
+        assert len(template_cache) == 2
+
+    def test_template_keyed_by_language(self):
+        class LabelSerializer(serializers.Serializer):
+            # Translated to the name of the active language
+            title = serializers.CharField(label=lazy(get_language, str)())
+
+        calls = []
+        view = self._make_view(
+            calls, serializer_class=LabelSerializer, xlsx_use_labels=True
+        )
+        for language in ("en", "fr", "en"):
+            with translation.override(language):
+                result = XLSXRenderer().render(
+                    [{"title": "a"}], renderer_context={"view": view}
+                )
+            assert load_workbook(io.BytesIO(result)).active["A2"].value == language
+        assert len(template_cache) == 2
+
+    def test_template_keyed_by_serializer_class(self):
+        class OtherSerializer(serializers.Serializer):
+            name = serializers.CharField()
+
+        calls = []
+        view = self._make_view(calls)
+        for serializer_class, key in (
+            (MySerializer, "title"),
+            (OtherSerializer, "name"),
+        ):
+            view.serializer_class = serializer_class
+            result = XLSXRenderer().render(
+                [{key: "a"}], renderer_context={"view": view}
+            )
+            assert load_workbook(io.BytesIO(result)).active["A2"].value == key
+        assert len(template_cache) == 2
+
+    def test_template_without_request(self):
+        class BoundSerializer(MySerializer):
+            def get_fields(self):
+                # i.e. fields reading the request from their context
+                fields = super().get_fields()
+                for name, field in fields.items():
+                    field.bind(name, self)
+                return fields
+
+        calls = []
+        view = self._make_view(calls, serializer_class=BoundSerializer)
+        view.request = object()
+        XLSXRenderer().render([{"title": "a"}], renderer_context={"view": view})
+        (template,) = template_cache._data.values()
+        field = template["fields_dict"]["title"]
+        assert isinstance(field, serializers.CharField)
+        assert field.parent is None
+        assert field.context == {}
+
+    def test_not_cached_by_default(self):
+        calls = []
+        view = self._make_view(calls, xlsx_cache_template=False)
+        XLSXRenderer().render([{"title": "a"}], renderer_context={"view": view})
+        assert len(template_cache) == 0
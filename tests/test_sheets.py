@@ -0,0 +1,91 @@
+import io
+
+import pytest
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Font
+
+from drf_excel.backends import XlsxWriterBackend
+from drf_excel.sheets import WriteOnlySheet
+
+
+def _save(wb):
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return load_workbook(buffer)
+
+
+def test_write_only_sheet():
+    wb = Workbook(write_only=True)
+    sheet = WriteOnlySheet(wb.create_sheet())
+    sheet.title = "Books"
+    sheet.column_dimensions["B"].width = 30
+    sheet.merge_cells("A1:B1")
+    sheet.cell(1, 1, "header")
+    sheet.cell(2, 2, "b2")
+    sheet.row_dimensions[2].height = 25
+    # Blank row in between
+    sheet.cell(4, 1, "a4")
+    sheet.flush()
+
+    ws = _save(wb)["Books"]
+    assert list(ws.values) == [
+        ("header", None),
+        (None, "b2"),
+        (None, None),
+        ("a4", None),
+    ]
+    assert [str(merged) for merged in ws.merged_cells.ranges] == ["A1:B1"]
+    assert ws.column_dimensions["B"].width == 30
+    assert ws.row_dimensions[2].height == 25
+
+
+def test_write_only_sheet_rows_in_order():
+    wb = Workbook(write_only=True)
+    sheet = WriteOnlySheet(wb.create_sheet())
+    sheet.cell(2, 1, "a2")
+    with pytest.raises(ValueError):
+        sheet.cell(1, 1, "a1")
+    sheet.flush()
+    assert list(_save(wb).active.values) == [(None,), ("a2",)]
+
+
+def test_xlsxwriter_sheet():
+    book = XlsxWriterBackend().new_workbook()
+    sheet = book.create_sheet()
+    sheet.title = "Books"
+    sheet.column_dimensions["B"].width = 30
+    sheet.merge_cells("A1:B1")
+    sheet.cell(1, 1, "header").font = Font(bold=True)
+    sheet.cell(2, 2, "b2")
+    sheet.row_dimensions[2].height = 25
+    # Blank row in between
+    sheet.cell(4, 1, "a4")
+    sheet.finish()
+
+    ws = load_workbook(io.BytesIO(XlsxWriterBackend().save(book)))["Books"]
+    assert list(ws.values) == [
+        ("header", None),
+        (None, "b2"),
+        (None, None),
+        ("a4", None),
+    ]
+    assert ws["A1"].font.b
+    assert [str(merged) for merged in ws.merged_cells.ranges] == ["A1:B1"]
+    assert ws.column_dimensions["B"].width == 30
+    assert ws.row_dimensions[2].height == 25
+
+
+def test_xlsxwriter_sheet_rows_in_order():
+    sheet = XlsxWriterBackend().new_workbook().create_sheet()
+    sheet.cell(2, 1, "a2")
+    with pytest.raises(ValueError):
+        sheet.cell(1, 1, "a1")
+
+
+def test_xlsxwriter_sheet_title():
+    sheet = XlsxWriterBackend().new_workbook().create_sheet("Books")
+    with pytest.raises(ValueError):
+        sheet.title = "Bad/Name"
+    with pytest.raises(ValueError):
+        sheet.title = ""
+    assert sheet.title == "Books"
@@ -0,0 +1,53 @@
+import pytest
+from django.core.cache import cache
+
+from drf_excel.singleflight import CacheSingleFlight, export_fingerprint
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def test_single_flight():
+    first = CacheSingleFlight("report")
+    second = CacheSingleFlight("report")
+    assert first.acquire()
+    assert not second.acquire()
+    assert second.get() is None
+    first.publish(b"content", [("Content-Type", "application/xlsx")])
+    assert second.get() == {
+        "content": b"content",
+        "headers": [("Content-Type", "application/xlsx")],
+    }
+    # Released once published
+    assert second.acquire()
+
+
+def test_release_own_lock_only():
+    first = CacheSingleFlight("report")
+    second = CacheSingleFlight("report")
+    assert first.acquire()
+    # The lock of `first` expired and was taken by `second`
+    cache.delete(first.lock_key)
+    assert second.acquire()
+    first.release()
+    assert not CacheSingleFlight("report").acquire()
+
+
+def test_publish_failure():
+    flight = CacheSingleFlight("report")
+    assert flight.acquire()
+    flight.publish()
+    assert flight.get() == {"content": None, "headers": []}
+
+
+def test_export_fingerprint():
+    assert export_fingerprint("a", [("b", "1")]) == export_fingerprint(
+        "a", [("b", "1")]
+    )
+    assert export_fingerprint("a", [("b", "1")]) != export_fingerprint(
+        "a", [("b", "2")]
+    )
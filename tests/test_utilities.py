@@ -2,14 +2,18 @@ import datetime as dt
 from types import SimpleNamespace
 
 import pytest
+from django.test import override_settings
 from openpyxl.cell import Cell
 from openpyxl.styles import Alignment, Border, Color, Font, PatternFill, Side
 from openpyxl.worksheet.worksheet import Worksheet
 
 from drf_excel.utilities import (
     XLSXStyle,
+    batch_formatter,
+    drf_excel_settings,
     get_attribute,
     get_setting,
+    is_batch_formatter,
     sanitize_value,
     set_cell_style,
 )
@@ -114,6 +118,22 @@ class TestGetAttribute:
         assert get_attribute(obj, "b") == 1
 
 
+class TestBatchFormatter:
+    def test_decorated(self):
+        @batch_formatter
+        def formatter(values):
+            return values
+
+        assert is_batch_formatter(formatter)
+        assert formatter([1, 2]) == [1, 2]
+
+    def test_scalar_formatter(self):
+        assert not is_batch_formatter(lambda value: value)
+
+    def test_not_callable(self):
+        assert not is_batch_formatter("display")
+
+
 class TestGetSetting:
     def test_not_defined(self):
         assert get_setting("DUMMY") is None
@@ -125,6 +145,32 @@ class TestGetSetting:
         settings.DRF_EXCEL_DUMMY = "custom-value"
         assert get_setting("DUMMY") == "custom-value"
 
+    def test_snapshot(self, settings, monkeypatch):
+        settings.DRF_EXCEL_DUMMY = "custom-value"
+        assert get_setting("DUMMY") == "custom-value"
+        # Later lookups don't read the Django settings
+        monkeypatch.setattr(
+            "drf_excel.utilities.django_settings", SimpleNamespace(), raising=True
+        )
+        assert get_setting("DUMMY") == "custom-value"
+        assert drf_excel_settings.values["DUMMY"] == "custom-value"
+
+    def test_reloaded_on_change(self, settings):
+        settings.DRF_EXCEL_DUMMY = "custom-value"
+        assert get_setting("DUMMY") == "custom-value"
+        settings.DRF_EXCEL_DUMMY = "other-value"
+        assert get_setting("DUMMY") == "other-value"
+
+    def test_reloaded_on_override(self):
+        with override_settings(DRF_EXCEL_DUMMY="custom-value"):
+            assert get_setting("DUMMY") == "custom-value"
+        assert get_setting("DUMMY") is None
+
+    def test_other_settings_keep_snapshot(self, settings):
+        values = drf_excel_settings.values
+        settings.DEBUG = not settings.DEBUG
+        assert drf_excel_settings.values is values
+
 
 @pytest.mark.parametrize(
     ("value", "expected_output"),
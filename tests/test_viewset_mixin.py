@@ -1,10 +1,30 @@
 import datetime as dt
+import io
+import threading
+from types import SimpleNamespace
 
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from openpyxl import Workbook, load_workbook
+from rest_framework import serializers
+from rest_framework.response import Response
 from rest_framework.test import APIClient
 from time_machine import TimeMachineFixture
 
-from tests.testapp.models import AllFieldsModel, ExampleModel, SecretFieldModel, Tag
+from drf_excel.limits import get_export_limiter
+from drf_excel.mixins import XLSXFileMixin
+from drf_excel.progress import CacheProgressSink
+from drf_excel.renderers import XLSXRenderer
+from drf_excel.singleflight import CacheSingleFlight
+from tests.testapp.models import (
+    AllFieldsModel,
+    Author,
+    Book,
+    ExampleModel,
+    SecretFieldModel,
+    Tag,
+)
 
 pytestmark = pytest.mark.django_db
 
@@ -14,6 +34,7 @@ def api_client():
     return APIClient()
 
 
+@pytest.mark.usefixtures("xlsx_engine")
 def test_simple_viewset_model(api_client, workbook_reader):
     ExampleModel.objects.create(title="test 1", description="This is a test")
     ExampleModel.objects.create(title="test 2", description="Another test")
@@ -55,6 +76,7 @@ def test_simple_viewset_model(api_client, workbook_reader):
     assert r3[1].value == "Testing this out"
 
 
+@pytest.mark.usefixtures("xlsx_engine")
 def test_all_fields_viewset(
     api_client, time_machine: TimeMachineFixture, workbook_reader
 ):
@@ -95,6 +117,24 @@ def test_all_fields_viewset(
     ]
 
 
+@pytest.mark.usefixtures("xlsx_engine")
+def test_all_fields_viewset_compiled(api_client, monkeypatch):
+    from tests.testapp.views import AllFieldsViewSet
+
+    instance = AllFieldsModel.objects.create(title="Hello", age=36, is_active=True)
+    instance.tags.set([Tag.objects.create(name="test")])
+    AllFieldsModel.objects.create(title="=1+1", age=0, is_active=False)
+
+    def export():
+        wb = load_workbook(io.BytesIO(api_client.get("/all-fields/").content))
+        return list(wb.active.values)
+
+    compiled = export()
+    monkeypatch.setattr(AllFieldsViewSet, "xlsx_compile_serializer", False)
+    assert compiled == export()
+
+
+@pytest.mark.usefixtures("xlsx_engine")
 def test_secret_field_viewset(api_client, workbook_reader):
     SecretFieldModel.objects.create(title="foo", secret="bar")
 
@@ -110,3 +150,601 @@ def test_secret_field_viewset(api_client, workbook_reader):
     # Check that the secret field is not included in the header or data
     assert [col.value for col in header] == ["title"]
     assert [col.value for col in data] == ["foo"]
+
+
+@pytest.mark.usefixtures("xlsx_engine")
+def test_auto_width_from_db(api_client):
+    ExampleModel.objects.create(title="test 1", description="short")
+    ExampleModel.objects.create(title="test 2", description="x" * 45)
+
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client.get("/auto-width/")
+    assert response.status_code == 200
+    assert len([q for q in queries if "LENGTH" in q["sql"]]) == 1
+
+    wb = load_workbook(io.BytesIO(response.content))
+    sheet = wb.worksheets[0]
+    assert sheet.column_dimensions["A"].width == 8
+    assert sheet.column_dimensions["B"].width == 47
+
+
+def _make_upload(rows):
+    wb = Workbook()
+    wb.active.append(["title", "description"])
+    for row in rows:
+        wb.active.append(row)
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def test_import_rows(api_client):
+    ExampleModel.objects.create(title="existing", description="old")
+    content = _make_upload(
+        [
+            ["existing", "new"],
+            ["created 1", "first"],
+            ["created 2", None],
+            ["created 3", "third"],
+            ["created 3", "third, again"],
+        ]
+    )
+
+    response = api_client.post(
+        "/import-examples/import/",
+        data=content,
+        content_type=XLSXRenderer.media_type,
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "created": 2,
+        # The second "created 3" row is in another batch and updates the first one
+        "updated": 2,
+        "error_count": 1,
+        "errors": [
+            {"row": 4, "errors": {"description": ["This field is required."]}},
+        ],
+    }
+    assert dict(ExampleModel.objects.values_list("title", "description")) == {
+        "existing": "new",
+        "created 1": "first",
+        "created 3": "third, again",
+    }
+
+
+def _select_queries(queries):
+    return [q["sql"] for q in queries if q["sql"].startswith("SELECT")]
+
+
+def test_export_queryset_optimized(api_client):
+    tags = [Tag.objects.create(name="sf"), Tag.objects.create(name="classic")]
+    for i in range(5):
+        author = Author.objects.create(name=f"author {i}")
+        book = Book.objects.create(title=f"book {i}", author=author)
+        book.tags.set(tags)
+
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client.get("/books/")
+    assert response.status_code == 200
+    # Books joined with their author, and the tags prefetched
+    assert len(_select_queries(queries)) == 2
+
+    wb = load_workbook(io.BytesIO(response.content))
+    rows = list(wb.active.values)
+    assert rows[0] == ("title", "author.name", "tags")
+    assert rows[1] == ("book 0", "author 0", "sf, classic")
+
+
+def test_export_queryset_prefetch_override(api_client):
+    tags = [Tag.objects.create(name="test"), Tag.objects.create(name="example")]
+    for i in range(3):
+        instance = AllFieldsModel.objects.create(title=f"{i}", age=i)
+        instance.tags.set(tags)
+
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client.get("/all-fields/")
+    assert response.status_code == 200
+    assert len(_select_queries(queries)) == 2
+
+
+def test_export_skips_write_only_columns(api_client):
+    SecretFieldModel.objects.create(title="foo", secret="bar")
+
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client.get("/secret-field/")
+    assert response.status_code == 200
+    (sql,) = _select_queries(queries)
+    assert '"secret"' not in sql
+
+
+def test_export_prunes_ignored_fields(api_client, monkeypatch):
+    from tests.testapp.views import AllFieldsViewSet
+
+    calls = []
+    monkeypatch.setattr(
+        AllFieldsViewSet, "xlsx_ignore_headers", ["tags"], raising=False
+    )
+    monkeypatch.setattr(
+        AllFieldsModel,
+        "get_tag_names",
+        lambda self: calls.append(self) or [],
+    )
+    AllFieldsModel.objects.create(title="foo", age=1)
+
+    response = api_client.get("/all-fields/")
+    assert response.status_code == 200
+    assert calls == []
+
+
+@pytest.fixture
+def books():
+    tag = Tag.objects.create(name="sf")
+    for i in range(3):
+        author = Author.objects.create(name=f"author {i}", bio="bio")
+        book = Book.objects.create(title=f"book {i}", author=author, summary="...")
+        book.tags.add(tag)
+
+
+@pytest.mark.usefixtures("xlsx_engine")
+@pytest.mark.parametrize(
+    "query, header",
+    [
+        ("fields=title,author", ("title", "author.name")),
+        ("fields=title&fields=author.name", ("title", "author.name")),
+        ("exclude=tags", ("title", "author.name")),
+        ("fields=title,tags&exclude=tags", ("title",)),
+    ],
+)
+def test_export_fields_param(api_client, books, query, header):
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client.get(f"/books/?{query}")
+    assert response.status_code == 200
+
+    wb = load_workbook(io.BytesIO(response.content))
+    rows = list(wb.active.values)
+    assert rows[0] == header
+    assert rows[1] == ("book 0", "author 0")[: len(header)]
+    # Tags aren't prefetched, and unused columns aren't loaded
+    (sql,) = _select_queries(queries)
+    assert '"summary"' not in sql
+
+
+def test_export_fields_param_unknown(api_client, books):
+    response = api_client.get("/books/?fields=title,nope")
+    assert response.status_code == 400
+
+
+@pytest.mark.usefixtures("xlsx_engine")
+def test_export_compiled_on_list_only(api_client, books, monkeypatch):
+    from tests.testapp.views import BookViewSet
+
+    compiled = []
+    compile_xlsx_serializer = BookViewSet.compile_xlsx_serializer
+
+    def compile_spy(self, serializer):
+        compiled.append(self.action)
+        return compile_xlsx_serializer(self, serializer)
+
+    monkeypatch.setattr(BookViewSet, "compile_xlsx_serializer", compile_spy)
+    assert api_client.get("/books/").status_code == 200
+    # Custom actions post-process the dicts of the regular serializer output
+    response = api_client.get("/books/titles/?fields=title")
+    assert response.status_code == 200
+    rows = list(load_workbook(io.BytesIO(response.content)).active.values)
+    assert rows == [("title",), ("BOOK 0",), ("BOOK 1",), ("BOOK 2",)]
+    assert compiled == ["list"]
+
+
+def test_export_compiled_list_api_view():
+    from rest_framework.generics import ListAPIView, ListCreateAPIView
+
+    from tests.testapp.serializers import BookSerializer
+
+    class BookListView(XLSXFileMixin, ListAPIView):
+        serializer_class = BookSerializer
+
+    class BookCreateView(XLSXFileMixin, ListCreateAPIView):
+        serializer_class = BookSerializer
+
+    class CustomListView(BookListView):
+        def list(self, request, *args, **kwargs):
+            return super().list(request, *args, **kwargs)
+
+    def should_compile(view_class, method="GET"):
+        view = view_class(request=SimpleNamespace(method=method))
+        return view.should_compile_xlsx_serializer()
+
+    assert should_compile(BookListView)
+    assert not should_compile(BookCreateView, "POST")
+    assert not should_compile(CustomListView)
+
+
+@pytest.fixture
+def limited_view(monkeypatch):
+    from tests.testapp.views import BookViewSet
+
+    monkeypatch.setattr(BookViewSet, "xlsx_max_concurrent_exports", 1)
+    monkeypatch.setattr(BookViewSet, "xlsx_export_limiter_scope", "test")
+    limiter = get_export_limiter("process", "test")
+    limiter.count = limiter.cost = 0
+    return limiter
+
+
+def test_export_limit(api_client, books, limited_view):
+    assert limited_view.acquire(0, max_concurrent=1)
+    response = api_client.get("/books/")
+    assert response.status_code == 429
+    assert response["Retry-After"] == "30"
+
+    limited_view.release(0)
+    response = api_client.get("/books/")
+    assert response.status_code == 200
+    # The slot is released once the workbook is rendered
+    assert limited_view.count == 0
+
+
+def test_export_limit_unavailable(api_client, books, limited_view, monkeypatch):
+    from tests.testapp.views import BookViewSet
+
+    monkeypatch.setattr(BookViewSet, "xlsx_export_limit_status", 503)
+    monkeypatch.setattr(BookViewSet, "xlsx_export_retry_after", 5)
+    limited_view.acquire(0, max_concurrent=1)
+    response = api_client.get("/books/")
+    assert response.status_code == 503
+    assert response["Retry-After"] == "5"
+
+
+def test_export_cost(api_client, books, limited_view, monkeypatch):
+    from tests.testapp.views import BookViewSet
+
+    monkeypatch.setattr(BookViewSet, "xlsx_max_concurrent_exports", None)
+    monkeypatch.setattr(BookViewSet, "xlsx_max_export_cost", 10)
+    limited_view.acquire(1, max_cost=10)
+    # 3 books x 3 columns fit in the budget
+    response = api_client.get("/books/")
+    assert response.status_code == 200
+    limited_view.acquire(1, max_cost=10)
+    response = api_client.get("/books/")
+    assert response.status_code == 429
+
+
+@pytest.mark.parametrize(
+    "write_only_threshold, refuse_threshold, status_code, engine",
+    [
+        (100, None, 200, "openpyxl"),
+        (5, None, 200, "write_only"),
+        (5, 8, 413, "refused"),
+    ],
+)
+def test_export_engine_selection(
+    api_client,
+    books,
+    monkeypatch,
+    write_only_threshold,
+    refuse_threshold,
+    status_code,
+    engine,
+):
+    from tests.testapp.views import BookViewSet
+
+    monkeypatch.setattr(BookViewSet, "xlsx_write_only_threshold", write_only_threshold)
+    monkeypatch.setattr(BookViewSet, "xlsx_refuse_threshold", refuse_threshold)
+    response = api_client.get("/books/")
+    assert response.status_code == status_code
+    assert response["X-XLSX-Engine"] == engine
+    # 3 books x 3 columns
+    assert response["X-XLSX-Estimated-Cost"] == "9"
+    if status_code == 200:
+        wb = load_workbook(io.BytesIO(response.content))
+        assert list(wb.active.values)[:2] == [
+            ("title", "author.name", "tags"),
+            ("book 0", "author 0", "sf"),
+        ]
+
+
+# Below and above the threshold, XlsxWriter streams the rows as well
+@pytest.mark.parametrize("write_only_threshold", [100, 5])
+def test_export_engine_setting(
+    api_client, books, monkeypatch, settings, write_only_threshold
+):
+    from tests.testapp.views import BookViewSet
+
+    settings.DRF_EXCEL_ENGINE = "xlsxwriter"
+    monkeypatch.setattr(BookViewSet, "xlsx_write_only_threshold", write_only_threshold)
+    response = api_client.get("/books/")
+    assert response["X-XLSX-Engine"] == "xlsxwriter"
+    wb = load_workbook(io.BytesIO(response.content))
+    assert list(wb.active.values)[1] == ("book 0", "author 0", "sf")
+
+
+def test_export_engine_forced(api_client, books, monkeypatch):
+    from tests.testapp.views import BookViewSet
+
+    monkeypatch.setattr(BookViewSet, "xlsx_engine", "write_only")
+    response = api_client.get("/books/")
+    assert response["X-XLSX-Engine"] == "write_only"
+    assert "X-XLSX-Estimated-Cost" not in response
+
+
+@pytest.fixture
+def progress_view(monkeypatch):
+    from django.core.cache import cache
+
+    from tests.testapp.views import BookViewSet
+
+    monkeypatch.setattr(BookViewSet, "xlsx_progress_param", "progress")
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def test_export_progress(api_client, books, progress_view):
+    response = api_client.get("/exports/abc/progress/", HTTP_ACCEPT="application/json")
+    assert response.status_code == 404
+
+    response = api_client.get("/books/?progress=abc")
+    assert response.status_code == 200
+    response = api_client.get("/exports/abc/progress/", HTTP_ACCEPT="application/json")
+    assert response.json() == {"phase": "done", "rows": 3, "total": 3}
+
+
+def test_export_progress_in_progress(api_client, books, progress_view):
+    CacheProgressSink().publish(
+        "anonymous:abc", {"phase": "writing", "rows": 1, "total": 3}
+    )
+    response = api_client.get("/books/?progress=abc")
+    assert response.status_code == 409
+    # The running export's progress is left as is
+    assert CacheProgressSink().get("anonymous:abc")["phase"] == "writing"
+
+
+def test_export_progress_failed(api_client, books, progress_view):
+    response = api_client.get("/books/?progress=abc&fields=nope")
+    assert response.status_code == 400
+    assert CacheProgressSink().get("anonymous:abc")["phase"] == "failed"
+
+
+@pytest.fixture
+def preview_view(monkeypatch):
+    from tests.testapp.views import BookViewSet
+
+    monkeypatch.setattr(BookViewSet, "xlsx_preview_param", "preview")
+    monkeypatch.setattr(BookViewSet, "xlsx_preview_rows", 2)
+
+
+@pytest.mark.usefixtures("xlsx_engine")
+def test_export_preview(api_client, books, preview_view):
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client.get("/books/?preview")
+    assert response.status_code == 200
+    assert response["X-XLSX-Preview"] == "2"
+
+    sheet = load_workbook(io.BytesIO(response.content)).active
+    assert sheet.title == "Report (Preview)"
+    assert [row[0] for row in sheet.values] == ["title", "book 0", "book 1"]
+    # Limited in the query
+    assert "LIMIT 2" in _select_queries(queries)[0]
+
+
+@pytest.mark.usefixtures("xlsx_engine")
+@pytest.mark.parametrize("query", ["", "?preview=0", "?preview=false"])
+def test_export_no_preview(api_client, books, preview_view, query):
+    response = api_client.get(f"/books/{query}")
+    assert "X-XLSX-Preview" not in response
+    sheet = load_workbook(io.BytesIO(response.content)).active
+    assert sheet.title == "Report"
+    assert sheet.max_row == 4
+
+
+def test_export_preview_auto_width_from_db(
+    api_client, books, preview_view, monkeypatch
+):
+    from tests.testapp.views import BookViewSet
+
+    monkeypatch.setattr(BookViewSet, "xlsx_auto_width_from_db", True)
+    monkeypatch.setattr(
+        BookViewSet, "column_header", {"column_width": "auto"}, raising=False
+    )
+    response = api_client.get("/books/?preview")
+    assert response.status_code == 200
+    sheet = load_workbook(io.BytesIO(response.content)).active
+    assert [row[0] for row in sheet.values] == ["title", "book 0", "book 1"]
+
+
+@pytest.mark.usefixtures("xlsx_engine")
+def test_export_plain_api_view(preview_view):
+    from rest_framework.test import APIRequestFactory
+    from rest_framework.views import APIView
+
+    class TitleSerializer(serializers.Serializer):
+        title = serializers.CharField()
+
+    class PlainView(XLSXFileMixin, APIView):
+        renderer_classes = (XLSXRenderer,)
+
+        def get_serializer(self, *args, **kwargs):
+            return TitleSerializer(*args, **kwargs)
+
+        def get(self, request):
+            return Response([{"title": "a"}])
+
+    response = PlainView.as_view()(APIRequestFactory().get("/"))
+    response.render()
+    assert response.status_code == 200
+    assert "X-XLSX-Preview" not in response
+    assert list(load_workbook(io.BytesIO(response.content)).active.values) == [
+        ("title",),
+        ("a",),
+    ]
+
+
+def test_export_cost_plain_api_view(books):
+    from rest_framework.test import APIRequestFactory
+    from rest_framework.views import APIView
+
+    class TitleSerializer(serializers.Serializer):
+        title = serializers.CharField()
+
+    class PlainView(XLSXFileMixin, APIView):
+        renderer_classes = (XLSXRenderer,)
+        paginator = None
+        xlsx_write_only_threshold = 1
+
+        def get_queryset(self):
+            return Book.objects.all()
+
+        def filter_queryset(self, queryset):
+            return queryset
+
+        def get_serializer_class(self):
+            return TitleSerializer
+
+        def get_serializer_context(self):
+            return {"request": self.request}
+
+        def get_serializer(self, *args, **kwargs):
+            return TitleSerializer(*args, **kwargs)
+
+        def get(self, request):
+            return Response(self.get_serializer(self.get_queryset(), many=True).data)
+
+    response = PlainView.as_view()(APIRequestFactory().get("/"))
+    assert response.status_code == 200
+    assert response["X-XLSX-Estimated-Cost"] == "3"
+    assert response["X-XLSX-Engine"] == "write_only"
+
+
+def test_export_preview_detail(api_client, books, preview_view):
+    book = Book.objects.get(title="book 2")
+    response = api_client.get(f"/books/{book.pk}/?preview")
+    assert response.status_code == 200
+    assert "X-XLSX-Preview" not in response
+
+
+@pytest.fixture
+def single_flight_view(monkeypatch):
+    from django.core.cache import cache
+
+    from tests.testapp.views import BookViewSet
+
+    monkeypatch.setattr(BookViewSet, "xlsx_single_flight", True)
+    monkeypatch.setattr(BookViewSet, "xlsx_single_flight_timeout", 2)
+    cache.clear()
+    yield BookViewSet
+    cache.clear()
+
+
+def test_single_flight_shares_result(api_client, books, single_flight_view):
+    response = api_client.get("/books/")
+    assert response.status_code == 200
+    assert "X-XLSX-Shared" not in response
+
+    # Requested again while the result is kept
+    with CaptureQueriesContext(connection) as queries:
+        shared = api_client.get("/books/")
+    assert shared["X-XLSX-Shared"] == "true"
+    assert shared.content == response.content
+    assert shared["content-disposition"] == response["content-disposition"]
+    assert shared["Content-Type"] == response["Content-Type"]
+    assert not _select_queries(queries)
+
+    # Other query parameters are another export
+    assert "X-XLSX-Shared" not in api_client.get("/books/?fields=title")
+
+
+def test_single_flight_waits_for_first_request(
+    api_client, books, single_flight_view, monkeypatch
+):
+    monkeypatch.setattr(
+        single_flight_view, "get_xlsx_export_fingerprint", lambda self: "books"
+    )
+    first = CacheSingleFlight("books")
+    assert first.acquire()
+    timer = threading.Timer(
+        0.2, first.publish, (b"workbook", [("Content-Type", "application/xlsx")])
+    )
+    timer.start()
+    try:
+        response = api_client.get("/books/")
+    finally:
+        timer.join()
+    assert response.status_code == 200
+    assert response["X-XLSX-Shared"] == "true"
+    assert response["Content-Type"] == "application/xlsx"
+    assert response.content == b"workbook"
+
+
+@pytest.mark.parametrize("failed", [True, False])
+def test_single_flight_renders_on_its_own(
+    api_client, books, single_flight_view, monkeypatch, failed
+):
+    monkeypatch.setattr(
+        single_flight_view, "get_xlsx_export_fingerprint", lambda self: "books"
+    )
+    monkeypatch.setattr(single_flight_view, "xlsx_single_flight_timeout", 0.2)
+    first = CacheSingleFlight("books")
+    assert first.acquire()
+    if failed:
+        first.publish()
+    # Rendered after the first request failed, or after waiting for it
+    response = api_client.get("/books/")
+    assert response.status_code == 200
+    assert "X-XLSX-Shared" not in response
+    assert load_workbook(io.BytesIO(response.content)).active.max_row == 4
+
+
+def test_export_limit_released_on_render_failure(
+    api_client, books, limited_view, monkeypatch
+):
+    def fail(*args, **kwargs):
+        raise ValueError("formatter failed")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(XLSXRenderer, "_make_body", fail)
+        with pytest.raises(ValueError):
+            api_client.get("/books/")
+    assert limited_view.count == 0
+    assert api_client.get("/books/").status_code == 200
+
+
+def test_export_released_on_view_error(
+    api_client, books, limited_view, single_flight_view, progress_view, monkeypatch
+):
+    from tests.testapp.views import BookViewSet
+
+    monkeypatch.setattr(
+        BookViewSet, "get_xlsx_export_fingerprint", lambda self: "books"
+    )
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("serializer failed")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(BookViewSet, "list", fail)
+        with pytest.raises(RuntimeError):
+            api_client.get("/books/?progress=abc")
+    assert limited_view.count == 0
+    assert CacheSingleFlight("books").get() == {"content": None, "headers": []}
+    assert CacheProgressSink().get("anonymous:abc")["phase"] == "failed"
+    assert api_client.get("/books/?progress=abc").status_code == 200
+
+
+def test_single_flight_released_on_render_failure(
+    api_client, books, single_flight_view, monkeypatch
+):
+    monkeypatch.setattr(
+        single_flight_view, "get_xlsx_export_fingerprint", lambda self: "books"
+    )
+
+    def fail(*args, **kwargs):
+        raise ValueError("formatter failed")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(XLSXRenderer, "_make_body", fail)
+        with pytest.raises(ValueError):
+            api_client.get("/books/")
+    flight = CacheSingleFlight("books")
+    # Waiting requests render on their own
+    assert flight.get() == {"content": None, "headers": []}
+    assert flight.acquire()
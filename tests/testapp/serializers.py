@@ -1,6 +1,6 @@
 from rest_framework import serializers
 
-from .models import AllFieldsModel, ExampleModel, SecretFieldModel
+from .models import AllFieldsModel, Author, Book, ExampleModel, SecretFieldModel
 
 
 class ExampleSerializer(serializers.ModelSerializer):
@@ -33,3 +33,18 @@ class SecretFieldSerializer(serializers.ModelSerializer):
         fields = ("title", "secret", "secret_external")
 
         extra_kwargs = {"secret": {"write_only": True}}
+
+
+class AuthorSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Author
+        fields = ("name",)
+
+
+class BookSerializer(serializers.ModelSerializer):
+    author = AuthorSerializer()
+    tags = serializers.StringRelatedField(many=True)
+
+    class Meta:
+        model = Book
+        fields = ("title", "author", "tags")
@@ -1,10 +1,18 @@
+from rest_framework.decorators import action
+from rest_framework.response import Response
 from rest_framework.viewsets import ReadOnlyModelViewSet
 
-from drf_excel.mixins import XLSXFileMixin
+from drf_excel.arrow import ArrowRenderer, ParquetRenderer
+from drf_excel.mixins import XLSXFileMixin, XLSXImportMixin
 from drf_excel.renderers import XLSXRenderer
 
-from .models import AllFieldsModel, ExampleModel, SecretFieldModel
-from .serializers import AllFieldsSerializer, ExampleSerializer, SecretFieldSerializer
+from .models import AllFieldsModel, Book, ExampleModel, SecretFieldModel
+from .serializers import (
+    AllFieldsSerializer,
+    BookSerializer,
+    ExampleSerializer,
+    SecretFieldSerializer,
+)
 
 
 class ExampleViewSet(XLSXFileMixin, ReadOnlyModelViewSet):
@@ -17,8 +25,10 @@ class ExampleViewSet(XLSXFileMixin, ReadOnlyModelViewSet):
 class AllFieldsViewSet(XLSXFileMixin, ReadOnlyModelViewSet):
     queryset = AllFieldsModel.objects.all()
     serializer_class = AllFieldsSerializer
-    renderer_classes = (XLSXRenderer,)
+    renderer_classes = (XLSXRenderer, ArrowRenderer, ParquetRenderer)
     filename = "al_fileds.xlsx"
+    # `tags` comes from the `get_tag_names` method, which can't be inspected
+    xlsx_prefetch_related = ["tags"]
 
 
 class SecretFieldViewSet(XLSXFileMixin, ReadOnlyModelViewSet):
@@ -26,3 +36,34 @@ class SecretFieldViewSet(XLSXFileMixin, ReadOnlyModelViewSet):
     serializer_class = SecretFieldSerializer
     renderer_classes = (XLSXRenderer,)
     filename = "secret.xlsx"
+
+
+class AutoWidthViewSet(XLSXFileMixin, ReadOnlyModelViewSet):
+    queryset = ExampleModel.objects.all()
+    serializer_class = ExampleSerializer
+    renderer_classes = (XLSXRenderer,)
+    column_header = {"column_width": "auto"}
+    xlsx_auto_width_from_db = True
+
+
+class ImportExampleViewSet(XLSXImportMixin, XLSXFileMixin, ReadOnlyModelViewSet):
+    queryset = ExampleModel.objects.all()
+    serializer_class = ExampleSerializer
+    renderer_classes = (XLSXRenderer,)
+    xlsx_import_batch_size = 2
+    xlsx_import_key = "title"
+
+
+class BookViewSet(XLSXFileMixin, ReadOnlyModelViewSet):
+    queryset = Book.objects.all()
+    serializer_class = BookSerializer
+    renderer_classes = (XLSXRenderer,)
+    xlsx_fields_param = "fields"
+    xlsx_exclude_param = "exclude"
+
+    @action(detail=False)
+    def titles(self, request):
+        serializer = self.get_serializer(self.get_queryset(), many=True)
+        return Response(
+            [{**row, "title": row["title"].upper()} for row in serializer.data]
+        )
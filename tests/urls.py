@@ -1,10 +1,25 @@
+from django.urls import path
 from rest_framework import routers
 
-from .testapp.views import AllFieldsViewSet, ExampleViewSet, SecretFieldViewSet
+from drf_excel.progress import ExportProgressView
+
+from .testapp.views import (
+    AllFieldsViewSet,
+    AutoWidthViewSet,
+    BookViewSet,
+    ExampleViewSet,
+    ImportExampleViewSet,
+    SecretFieldViewSet,
+)
 
 router = routers.SimpleRouter()
 router.register(r"examples", ExampleViewSet)
 router.register(r"all-fields", AllFieldsViewSet)
 router.register(r"secret-field", SecretFieldViewSet)
+router.register(r"books", BookViewSet)
+router.register(r"auto-width", AutoWidthViewSet, basename="auto-width")
+router.register(r"import-examples", ImportExampleViewSet, basename="import-examples")
 
-urlpatterns = router.urls
+urlpatterns = router.urls + [
+    path("exports/<str:token>/progress/", ExportProgressView.as_view()),
+]